@@ -1,9 +1,69 @@
-from OpenGL.GL import *
-from OpenGL.GLUT import *
-from OpenGL.GLU import *
 import math
 import time
 import random
+import sqlite3
+import argparse
+import array
+import atexit
+import bisect
+import collections
+import ctypes
+import gc
+import hashlib
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
+import queue
+import statistics
+import struct
+import subprocess
+import sys
+import threading
+import traceback
+import tracemalloc
+import zlib
+
+# Rendering backend - PyOpenGL is only imported by load_gl() when a window is
+# opened, so headless runs and pure-logic imports never need the GL libraries
+gl_loaded = False
+
+def load_gl():
+    """Import PyOpenGL and publish its GL/GLU/GLUT names as module globals"""
+    global gl_loaded
+    
+    if gl_loaded:
+        return
+    from OpenGL import GL, GLU, GLUT
+    
+    namespace = globals()
+    for module in (GL, GLU, GLUT):
+        for name in dir(module):
+            # Same effect as the star imports, minus clobbering our own names (os, sys, ...)
+            if not name.startswith('_') and name not in namespace:
+                namespace[name] = getattr(module, name)
+    gl_loaded = True
+
+# Shutdown - work that has to finish however the game ends. Closing the window makes freeglut
+# call exit(), which skips Python's atexit handlers, so main() has glutMainLoop() return and
+# runs the hooks itself; atexit covers the modes without a window
+close_hooks = []
+
+def on_close(hook):
+    """Run hook once when the game shuts down - hooks run newest first"""
+    if not close_hooks:
+        atexit.register(run_close_hooks)
+    close_hooks.append(hook)
+
+def run_close_hooks():
+    """Run every pending close hook - one that fails does not stop the rest"""
+    while close_hooks:
+        hook = close_hooks.pop()
+        try:
+            hook()
+        except Exception:
+            traceback.print_exc()
 
 # Game states
 GAME_STATE_START = 0
@@ -18,9 +78,30 @@ CAMERA_THIRD_PERSON = 1   # Behind car view
 game_state = GAME_STATE_START
 camera_mode = CAMERA_THIRD_PERSON  # Start with third person
 camera_pos = (0, 50, 100)
+camera_eye = (1000, 1000, 800)  # Where setupCamera() last placed the eye
+view_cone = None        # (eye x, eye y, yaw, half horizontal fov) for culling - None draws everything
+VIEW_CULL_MARGIN = 0.2  # Radians added to the field of view - the chase camera looks down at the car
+VIEW_CULL_NEAR = 150    # Anything this close to the eye is always drawn
+CHECKPOINT_CULL_RADIUS = 150  # Arches span the track
+OBSTACLE_CULL_PAD = 60        # Tree crowns and building roofs reach past the collision radius
 fovY = 60
 GRID_LENGTH = 2000
 
+# Window and render resolution - the HUD is laid out on a virtual 1000x800 canvas
+window_width = 1000
+window_height = 800
+HUD_WIDTH = 1000
+HUD_HEIGHT = 800
+render_scale = 1.0      # Fraction of the window resolution the 3D scene is drawn at
+target_fps = 0          # Adjust render_scale automatically to hold this (0 = off)
+RENDER_SCALE_MIN = 0.5
+RENDER_SCALE_STEP = 0.05
+RENDER_SCALE_INTERVAL = 30  # Frames between adjustments
+render_target = None    # Offscreen framebuffer for scaled rendering
+frame_time_avg = None
+frames_since_scale = 0
+last_frame_time = None  # perf_counter() at the previous frame - None until the first one
+
 # Key states for continuous movement
 keys_pressed = {
     b'w': False,
@@ -44,7 +125,6 @@ car_reverse_max = -100
 current_checkpoint = 0
 current_lap = 1
 total_laps = 3
-checkpoints = []  # Will be populated with checkpoint positions
 checkpoint_radius = 100
 lap_times = []
 best_lap_time = float('inf')
@@ -56,64 +136,283 @@ current_time = 0
 off_track_penalty = 0.5  # Speed multiplier when off track
 is_off_track = False
 collision_bounce = 30
-obstacles = []  # Trees and buildings positions
 
 # Visual effects
 speed_lines = []
-boost_points = []
 boost_active = False
 boost_timer = 0
 boost_speed_multiplier = 1.5
 
-# Birds for animation
-birds = []
-
 # Sun rotation
 sun_angle = 0
 
-# Clouds
-clouds = []
+# Simulation clock - wall time when playing, tick time in headless runs
+clock = time.time
+last_tick_time = time.perf_counter()
+
+# Surface map - track surfaces rasterised once so lookups are a single index
+SURFACE_ASPHALT = 0
+SURFACE_KERB = 1
+SURFACE_GRASS = 2
+SURFACE_GRAVEL = 3
+SURFACE_NAMES = ('asphalt', 'kerb', 'grass', 'gravel')
+SURFACE_SPEED = (1.0, 0.95, 1.0, 0.7)        # Extra speed multiplier (off_track_penalty applies on top off the track)
+SURFACE_FRICTION = (1.0, 1.0, 0.995, 0.97)   # Scales car_friction when coasting
+SURFACE_ON_TRACK = (True, True, False, False)
+
+# Track definition - (inner radius, outer radius, surface) rings painted in order over grass
+TRACK_BANDS = (
+    (900, 960, SURFACE_GRAVEL),   # Run-off trap outside the track
+    (700, 900, SURFACE_ASPHALT),
+    (700, 712, SURFACE_KERB),
+    (888, 900, SURFACE_KERB),
+)
+SURFACE_CELL = 5                  # World units per raster cell
+SURFACE_EXTENT = GRID_LENGTH      # Raster covers +/- this; everything beyond is grass
+SURFACE_MAP_VERSION = 1
+SURFACE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.surface_cache')
+
+surface_map = None   # bytearray of surface ids, row-major from (-extent, -extent)
+surface_cells = 0    # Cells per side
+current_surface = SURFACE_ASPHALT
+
+def build_surface_map():
+    """Rasterise TRACK_BANDS, filling each row with whole spans instead of per-cell tests"""
+    cells = int(2 * SURFACE_EXTENT / SURFACE_CELL)
+    raster = bytearray([SURFACE_GRASS]) * (cells * cells)
+    
+    for j in range(cells):
+        y = -SURFACE_EXTENT + (j + 0.5) * SURFACE_CELL  # Classify by cell centre
+        row = j * cells
+        for inner, outer, surface in TRACK_BANDS:
+            if abs(y) >= outer:
+                continue
+            x_outer = math.sqrt(outer**2 - y**2)
+            x_inner = math.sqrt(inner**2 - y**2) if abs(y) < inner else 0.0
+            # The ring crosses this row in two spans, x in [-outer, -inner) and [inner, outer)
+            for lo, hi in ((-x_outer, -x_inner), (x_inner, x_outer)):
+                first = max(0, math.ceil((lo + SURFACE_EXTENT) / SURFACE_CELL - 0.5))
+                last = min(cells, math.ceil((hi + SURFACE_EXTENT) / SURFACE_CELL - 0.5))
+                if last > first:
+                    raster[row + first:row + last] = bytes([surface]) * (last - first)
+    return cells, raster
+
+def surface_cache_path():
+    """Cache file for the current track definition and raster settings"""
+    key = json.dumps({'version': SURFACE_MAP_VERSION, 'bands': TRACK_BANDS,
+                      'cell': SURFACE_CELL, 'extent': SURFACE_EXTENT})
+    return os.path.join(SURFACE_CACHE_DIR, f"surface-{hashlib.sha1(key.encode()).hexdigest()[:16]}.bin")
+
+def load_surface_map():
+    """Load the surface raster from the disk cache, building and caching it if needed"""
+    global surface_map, surface_cells
+    
+    path = surface_cache_path()
+    try:
+        with open(path, 'rb') as f:
+            cells, = struct.unpack('<I', f.read(4))
+            raster = bytearray(f.read())
+        if len(raster) == cells * cells:
+            surface_cells, surface_map = cells, raster
+            return
+    except (OSError, struct.error):
+        pass
+    
+    surface_cells, surface_map = build_surface_map()
+    try:
+        os.makedirs(SURFACE_CACHE_DIR, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(struct.pack('<I', surface_cells))
+            f.write(surface_map)
+        os.replace(temp_path, path)
+    except OSError:
+        pass  # A read-only install just rebuilds next time
+
+def surface_at(x, y):
+    """Surface id under (x, y)"""
+    i = (x + SURFACE_EXTENT) / SURFACE_CELL
+    j = (y + SURFACE_EXTENT) / SURFACE_CELL
+    if 0 <= i < surface_cells and 0 <= j < surface_cells:
+        return surface_map[int(j) * surface_cells + int(i)]
+    return SURFACE_GRASS
+
+def surfaces_at(xs, ys):
+    """Surface ids for many positions at once, e.g. a whole field of AI cars"""
+    raster = surface_map
+    cells = surface_cells
+    extent = SURFACE_EXTENT
+    scale = 1.0 / SURFACE_CELL
+    result = bytearray([SURFACE_GRASS]) * len(xs)
+    for n, (x, y) in enumerate(zip(xs, ys)):
+        i = (x + extent) * scale
+        j = (y + extent) * scale
+        if 0 <= i < cells and 0 <= j < cells:
+            result[n] = raster[int(j) * cells + int(i)]
+    return result
 
-class Bird:
+# Entity store - world objects kept in typed, contiguous component arrays
+KIND_TREE = 0
+KIND_BUILDING = 1
+KIND_CHECKPOINT = 2
+KIND_BOOST = 3
+KIND_BIRD = 4
+KIND_CLOUD = 5
+FLAG_COLLECTED = 1
+
+class EntityStore:
+    """Struct-of-arrays storage - each system reads only the component arrays it needs"""
+    COMPONENTS = (
+        ('x', 'd'), ('y', 'd'), ('z', 'd'),
+        ('vx', 'f'), ('vy', 'f'),   # Velocity (birds) / drift speed (clouds)
+        ('radius', 'f'),            # Collision radius / cloud size
+        ('angle', 'f'),             # Checkpoint orientation / bird wing angle
+        ('kind', 'B'),
+        ('flags', 'B'),
+    )
+    
     def __init__(self):
-        self.pos = [random.uniform(-GRID_LENGTH, GRID_LENGTH), 
-                   random.uniform(-GRID_LENGTH, GRID_LENGTH), 
-                   random.uniform(200, 400)]
-        self.velocity = [random.uniform(-5, 5), random.uniform(-5, 5), 0]
-        self.wing_angle = 0
-        
-    def update(self):
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
-        self.wing_angle = math.sin(time.time() * 10) * 30
+        for name, code in self.COMPONENTS:
+            setattr(self, name, array.array(code))
+    
+    def __len__(self):
+        return len(self.x)
+    
+    def __getitem__(self, index):
+        if not -len(self.x) <= index < len(self.x):
+            raise IndexError(index)
+        return EntityView(self, index % len(self.x))
+    
+    def __iter__(self):
+        return (EntityView(self, i) for i in range(len(self.x)))
+    
+    def add(self, kind, x, y, z=0.0, radius=0.0, angle=0.0, vx=0.0, vy=0.0, flags=0):
+        """Append an entity and return its index"""
+        self.x.append(x)
+        self.y.append(y)
+        self.z.append(z)
+        self.vx.append(vx)
+        self.vy.append(vy)
+        self.radius.append(radius)
+        self.angle.append(angle)
+        self.kind.append(kind)
+        self.flags.append(flags)
+        return len(self.x) - 1
+    
+    def clear(self):
+        for name, code in self.COMPONENTS:
+            setattr(self, name, array.array(code))
+    
+    def memory(self):
+        """Bytes used by the component arrays"""
+        return sum(len(getattr(self, name)) * getattr(self, name).itemsize for name, _ in self.COMPONENTS)
+    
+    def to_bytes(self):
+        """Serialize as a count followed by each component array"""
+        return struct.pack('<I', len(self)) + b''.join(getattr(self, name).tobytes()
+                                                       for name, _ in self.COMPONENTS)
+    
+    def load_bytes(self, data):
+        """Replace the contents with data produced by to_bytes()"""
+        count, = struct.unpack_from('<I', data)
+        offset = 4
+        for name, code in self.COMPONENTS:
+            component = array.array(code)
+            size = count * component.itemsize
+            component.frombytes(data[offset:offset + size])
+            setattr(self, name, component)
+            offset += size
+
+class EntityView:
+    """Lightweight handle on one entity, for code that wants an object rather than arrays"""
+    __slots__ = ('store', 'index')
+    
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+    
+    @property
+    def pos(self):
+        return (self.store.x[self.index], self.store.y[self.index])
+    
+    @property
+    def kind(self):
+        return self.store.kind[self.index]
+    
+    @property
+    def radius(self):
+        return self.store.radius[self.index]
+    
+    @property
+    def angle(self):
+        return self.store.angle[self.index]
+    
+    @property
+    def collected(self):
+        return bool(self.store.flags[self.index] & FLAG_COLLECTED)
+    
+    @collected.setter
+    def collected(self, value):
+        if value:
+            self.store.flags[self.index] |= FLAG_COLLECTED
+        else:
+            self.store.flags[self.index] &= ~FLAG_COLLECTED
+
+def spawn_bird():
+    """Add a bird at a random spot in the sky"""
+    x = random.uniform(-GRID_LENGTH, GRID_LENGTH)
+    y = random.uniform(-GRID_LENGTH, GRID_LENGTH)
+    z = random.uniform(200, 400)
+    vx = random.uniform(-5, 5)
+    vy = random.uniform(-5, 5)
+    birds.add(KIND_BIRD, x, y, z, vx=vx, vy=vy)
+
+def spawn_cloud():
+    """Add a cloud at a random spot in the sky"""
+    x = random.uniform(-GRID_LENGTH, GRID_LENGTH)
+    y = random.uniform(-GRID_LENGTH, GRID_LENGTH)
+    z = random.uniform(300, 500)
+    size = random.uniform(30, 60)
+    drift_speed = random.uniform(0.5, 2)
+    clouds.add(KIND_CLOUD, x, y, z, radius=size, vx=drift_speed)
+
+def update_birds():
+    """Fly every bird one step, wrapping at the world edge"""
+    xs, ys, vxs, vys = birds.x, birds.y, birds.vx, birds.vy
+    wing_angle = math.sin(time.time() * 10) * 30
+    for i in range(len(xs)):
+        xs[i] += vxs[i]
+        ys[i] += vys[i]
+        birds.angle[i] = wing_angle
         
         # Wrap around
-        if abs(self.pos[0]) > GRID_LENGTH:
-            self.pos[0] = -self.pos[0]
-        if abs(self.pos[1]) > GRID_LENGTH:
-            self.pos[1] = -self.pos[1]
+        if abs(xs[i]) > GRID_LENGTH:
+            xs[i] = -xs[i]
+        if abs(ys[i]) > GRID_LENGTH:
+            ys[i] = -ys[i]
 
-class Cloud:
-    def __init__(self):
-        self.pos = [random.uniform(-GRID_LENGTH, GRID_LENGTH),
-                   random.uniform(-GRID_LENGTH, GRID_LENGTH),
-                   random.uniform(300, 500)]
-        self.size = random.uniform(30, 60)
-        self.drift_speed = random.uniform(0.5, 2)
-    
-    def update(self):
-        self.pos[0] += self.drift_speed
-        if self.pos[0] > GRID_LENGTH:
-            self.pos[0] = -GRID_LENGTH
+def update_clouds():
+    """Drift every cloud along x, wrapping at the world edge"""
+    xs, drift = clouds.x, clouds.vx
+    for i in range(len(xs)):
+        xs[i] += drift[i]
+        if xs[i] > GRID_LENGTH:
+            xs[i] = -GRID_LENGTH
+
+# World objects
+checkpoints = EntityStore()   # Gates, in lap order
+obstacles = EntityStore()     # Trees and buildings around the circuit
+boost_points = EntityStore()  # Boost pickups on the racing line
+birds = EntityStore()
+clouds = EntityStore()
 
 def init_game():
     """Initialize game components"""
-    global checkpoints, obstacles, birds, boost_points, clouds, car_pos, car_rotation
+    global checkpoints, obstacles, birds, boost_points, clouds
+    global layout_version, start_snapshot, race_progress
     
-    # Reset car to start position on track - on the straight part facing along track
-    # Position at the right side of track (x=800, y=0) facing upward (90 degrees)
-    car_pos = [800, 0, 5]
-    car_rotation = 90  # 90 degrees = facing upward along Y axis (along the track)
+    if surface_map is None:
+        load_surface_map()
     
     # Clear previous data
     checkpoints.clear()
@@ -135,7 +434,7 @@ def init_game():
         # Tangent direction is perpendicular to radius, so checkpoint aligns with radius
         checkpoint_angle = angle * 180 / math.pi  # Convert to degrees, align with radius from center
         
-        checkpoints.append({'pos': (x, y), 'angle': checkpoint_angle})
+        checkpoints.add(KIND_CHECKPOINT, x, y, angle=checkpoint_angle)
     
     # Create properly placed obstacles
     # Trees inside the track circle - avoid track area
@@ -144,7 +443,7 @@ def init_game():
         radius = random.uniform(400, 650)  # Well inside track
         x = math.cos(angle) * radius
         y = math.sin(angle) * radius
-        obstacles.append({'pos': (x, y), 'type': 'tree', 'radius': 20})
+        obstacles.add(KIND_TREE, x, y, radius=20)
     
     # Trees outside the track - avoid track area
     for i in range(10):
@@ -152,7 +451,7 @@ def init_game():
         radius = random.uniform(950, 1400)  # Well outside track
         x = math.cos(angle) * radius
         y = math.sin(angle) * radius
-        obstacles.append({'pos': (x, y), 'type': 'tree', 'radius': 20})
+        obstacles.add(KIND_TREE, x, y, radius=20)
     
     # Buildings further out
     for i in range(6):
@@ -160,15 +459,16 @@ def init_game():
         radius = 1200
         x = math.cos(angle) * radius
         y = math.sin(angle) * radius
-        obstacles.append({'pos': (x, y), 'type': 'building', 'radius': 35})
+        obstacles.add(KIND_BUILDING, x, y, radius=35)
+    index_obstacles()
     
     # Create birds
     for i in range(5):
-        birds.append(Bird())
+        spawn_bird()
     
     # Create clouds
     for i in range(8):
-        clouds.append(Cloud())
+        spawn_cloud()
     
     # Create boost points on the track
     for i in range(3):
@@ -176,15 +476,240 @@ def init_game():
         radius = 800  # On the track centerline
         x = math.cos(angle) * radius
         y = math.sin(angle) * radius
-        boost_points.append({'pos': (x, y), 'collected': False})
+        boost_points.add(KIND_BOOST, x, y, radius=40)
+    
+    layout_version += 1
+    race_progress = RaceProgress(track_centreline(),
+                                 [(checkpoints.x[i], checkpoints.y[i]) for i in range(len(checkpoints))])
+    
+    # Car at the right side of the track (x=800, y=0) facing upward along it (90 degrees)
+    reset_race()
+    start_snapshot = capture_state()
+
+def reset_race():
+    """Put the car, timing, checkpoints and boosts back to the start of a race"""
+    global game_state, car_rotation, car_speed, current_checkpoint, current_lap, best_lap_time
+    global race_start_time, lap_start_time, current_time, boost_active, boost_timer
+    global is_off_track, current_surface, race_rewound
+    
+    game_state = GAME_STATE_START
+    car_pos[:] = [800, 0, 5]
+    car_rotation = 90  # Face upward along the track
+    car_speed = 0
+    current_checkpoint = 0
+    current_lap = 1
+    lap_times.clear()
+    best_lap_time = float('inf')
+    race_start_time = lap_start_time = current_time = 0
+    boost_active = False
+    boost_timer = 0
+    is_off_track = False
+    current_surface = SURFACE_ASPHALT
+    race_rewound = False
+    for k in keys_pressed:
+        keys_pressed[k] = False
+    for i in range(len(boost_points)):
+        boost_points.flags[i] &= ~FLAG_COLLECTED
+
+# Snapshots - the whole simulation state packed into one versioned bytes object.
+# Times are stored relative to the clock, so a snapshot restores correctly later on.
+SNAPSHOT_MAGIC = b'RCSS'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_KEYS = (b'w', b's', b'a', b'd')
+SNAPSHOT_HEADER = struct.Struct('<4sHBB??4?HHH3d8dHHHH')
+SNAPSHOT_RNG = struct.Struct('<625Id')  # Mersenne Twister words and the cached gauss value
+
+start_snapshot = None   # Captured by init_game() - restoring it restarts the race
+
+def capture_state():
+    """Pack car, timing, checkpoints, boosts, RNG and ambient entities into a snapshot"""
+    now = clock()
+    _, rng_words, gauss_next = random.getstate()
+    header = SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC, SNAPSHOT_VERSION, game_state, current_surface, is_off_track, boost_active,
+        *[keys_pressed[key] for key in SNAPSHOT_KEYS],
+        current_checkpoint, current_lap, total_laps,
+        car_pos[0], car_pos[1], car_pos[2], car_rotation, car_speed, best_lap_time,
+        now - race_start_time, now - lap_start_time, current_time, boost_timer - now, sun_angle,
+        len(lap_times), len(boost_points), len(birds), len(clouds))
+    return b''.join((header, array.array('d', lap_times).tobytes(), boost_points.flags.tobytes(),
+                     birds.x.tobytes(), birds.y.tobytes(), birds.angle.tobytes(), clouds.x.tobytes(),
+                     SNAPSHOT_RNG.pack(*rng_words, float('nan') if gauss_next is None else gauss_next)))
+
+def restore_state(snapshot):
+    """Put the simulation back exactly as capture_state() found it"""
+    global game_state, car_rotation, car_speed, current_checkpoint, current_lap, total_laps
+    global best_lap_time, race_start_time, lap_start_time, current_time, boost_active, boost_timer
+    global is_off_track, current_surface, sun_angle
+    
+    (magic, version, state, surface, off_track, boost, *keys, checkpoint, lap, laps,
+     x, y, z, rotation, speed, best, race_elapsed, lap_elapsed, elapsed, boost_left, sun,
+     lap_count, boost_count, bird_count, cloud_count) = SNAPSHOT_HEADER.unpack_from(snapshot)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot (version {version})")
+    if (boost_count, bird_count, cloud_count) != (len(boost_points), len(birds), len(clouds)):
+        raise ValueError("Snapshot was taken in a different world layout")
+    
+    now = clock()
+    game_state, current_surface, is_off_track, boost_active = state, surface, off_track, boost
+    keys_pressed.update(zip(SNAPSHOT_KEYS, keys))
+    current_checkpoint, current_lap, total_laps = checkpoint, lap, laps
+    car_pos[:] = (x, y, z)
+    car_rotation, car_speed, best_lap_time = rotation, speed, best
+    race_start_time = now - race_elapsed
+    lap_start_time = now - lap_elapsed
+    current_time = elapsed
+    boost_timer = now + boost_left
+    sun_angle = sun
+    
+    view = memoryview(snapshot)
+    offset = SNAPSHOT_HEADER.size
+    for target, name, code, count in ((None, None, 'd', lap_count),
+                                      (boost_points, 'flags', 'B', boost_count),
+                                      (birds, 'x', 'd', bird_count), (birds, 'y', 'd', bird_count),
+                                      (birds, 'angle', 'f', bird_count), (clouds, 'x', 'd', cloud_count)):
+        component = array.array(code)
+        size = count * component.itemsize
+        component.frombytes(view[offset:offset + size])
+        offset += size
+        if target is None:
+            lap_times[:] = component
+        else:
+            setattr(target, name, component)
+    
+    *rng_words, gauss_next = SNAPSHOT_RNG.unpack_from(snapshot, offset)
+    random.setstate((3, tuple(rng_words), None if gauss_next != gauss_next else gauss_next))
+
+# Rewind - a bounded ring of recent snapshots, keyed by race time
+REWIND_SECONDS = 10     # History kept
+REWIND_INTERVAL = 0.1   # Race seconds between snapshots
+REWIND_STEP = 2         # Seconds one press of B goes back
+
+rewind_buffer = None    # RewindBuffer while playing, unless rewinding is turned off
+race_rewound = False    # Rewound races are not submitted to the leaderboard
+
+class RewindBuffer:
+    """Keeps the last few seconds of snapshots, oldest dropped first"""
+    def __init__(self, seconds=REWIND_SECONDS, interval=REWIND_INTERVAL):
+        self.interval = interval
+        self.snapshots = collections.deque(maxlen=max(1, int(seconds / interval)))
+    
+    def record(self):
+        """Capture the current state if an interval has passed since the last one"""
+        if self.snapshots and current_time - self.snapshots[-1][0] < self.interval:
+            return
+        self.snapshots.append((current_time, capture_state()))
+    
+    def rewind(self, seconds):
+        """Restore the newest snapshot at least `seconds` old (or the oldest kept)"""
+        target = current_time - seconds
+        while len(self.snapshots) > 1 and self.snapshots[-1][0] > target:
+            self.snapshots.pop()
+        if not self.snapshots:
+            return False
+        restore_state(self.snapshots[-1][1])
+        return True
+    
+    def clear(self):
+        self.snapshots.clear()
+
+shared_quadric = None  # One GLU quadric reused by every draw call
+
+def get_quadric():
+    """The shared quadric - creating one per draw call leaks a GLU object each time"""
+    global shared_quadric
+    
+    if shared_quadric is None:
+        shared_quadric = gluNewQuadric()
+    return shared_quadric
+
+# Render queue - world objects are submitted as small commands and drawn sorted by layer,
+# then colour, then distance, so each colour is set once per frame and opaque pieces go
+# front to back (nearer pieces fill the depth buffer first and hide what is behind them)
+RENDER_WORLD = 0        # Opaque world objects
+RENDER_EFFECTS = 1      # Drawn after everything solid
+OWN_COLOURS = ()        # Colour key for commands that set their own colours - sorts first
+
+TRUNK_COLOUR = (0.4, 0.2, 0.05)
+FOLIAGE_COLOUR = (0, 0.5, 0)
+FOLIAGE_LIGHT_COLOUR = (0, 0.6, 0)
+FOLIAGE_DARK_COLOUR = (0, 0.4, 0)
+BUILDING_COLOUR = (0.6, 0.6, 0.7)
+WINDOW_COLOUR = (0.2, 0.2, 0.8)
+STAND_COLOUR = (0.7, 0.7, 0.8)
+STAND_ROOF_COLOUR = (0.8, 0.2, 0.2)
+GATE_PASSED_COLOUR = (0, 1, 0)
+GATE_AHEAD_COLOUR = (1, 0, 0)
+BANNER_COLOUR = (1, 1, 1)
+FINISH_FLAG_COLOUR = (1, 0, 0)
+BIRD_COLOUR = (0.2, 0.2, 0.2)
+WING_COLOUR = (0.3, 0.3, 0.3)
+BOOST_COLOUR = (1, 1, 0)
+
+class RenderQueue:
+    """Per-view list of draw commands, sorted and flushed once everything is submitted"""
+    def __init__(self):
+        self.commands = []
+        self.sort = True            # False keeps submission order, for comparison
+        self.submitted = 0          # Running totals for benchmarks - callers take differences
+        self.colour_changes = 0
+        self.colour_skips = 0       # glColor calls a piece-by-piece draw would have made
+    
+    def submit(self, layer, colour, x, y, z, draw, *args):
+        """Queue draw(*args) for a piece centred near (x, y, z)"""
+        depth = (x - camera_eye[0])**2 + (y - camera_eye[1])**2 + (z - camera_eye[2])**2
+        self.commands.append((layer, colour, depth, len(self.commands), draw, args))
+    
+    def flush(self):
+        """Draw and clear the queue, setting the colour only when it changes"""
+        commands = self.commands
+        if self.sort:
+            commands.sort()
+        
+        current = None
+        for layer, colour, depth, seq, draw, args in commands:
+            if colour is not OWN_COLOURS:
+                if colour == current:
+                    self.colour_skips += 1
+                else:
+                    glColor3f(*colour)
+                    self.colour_changes += 1
+                    current = colour
+            draw(*args)
+            if colour is OWN_COLOURS:
+                current = None  # Whatever it left behind is unknown
+        
+        self.submitted += len(commands)
+        commands.clear()
+
+render_queue = RenderQueue()
+
+def draw_sphere_piece(x, y, z, radius, detail):
+    """A sphere at (x, y, z) in the current colour"""
+    glPushMatrix()
+    glTranslatef(x, y, z)
+    gluSphere(get_quadric(), radius, detail, detail)
+    glPopMatrix()
+
+def draw_box_piece(x, y, z, heading, sx, sy, sz, size):
+    """A scaled cube at (x, y, z) turned by heading degrees, in the current colour"""
+    glPushMatrix()
+    glTranslatef(x, y, z)
+    if heading:
+        glRotatef(heading, 0, 0, 1)
+    glScalef(sx, sy, sz)
+    glutSolidCube(size)
+    glPopMatrix()
 
-def draw_text(x, y, text, font=GLUT_BITMAP_HELVETICA_18):
+def draw_text(x, y, text, font=None):
     """Draw text on screen"""
+    if font is None:
+        font = GLUT_BITMAP_HELVETICA_18
     glColor3f(1, 1, 1)
     glMatrixMode(GL_PROJECTION)
     glPushMatrix()
     glLoadIdentity()
-    gluOrtho2D(0, 1000, 0, 800)
+    gluOrtho2D(0, HUD_WIDTH, 0, HUD_HEIGHT)
     
     glMatrixMode(GL_MODELVIEW)
     glPushMatrix()
@@ -199,26 +724,24 @@ def draw_text(x, y, text, font=GLUT_BITMAP_HELVETICA_18):
     glPopMatrix()
     glMatrixMode(GL_MODELVIEW)
 
-def draw_sports_car():
-    """Draw a Lamborghini/Porsche style sports car"""
-    global car_speed
-    
-    glPushMatrix()
-    glTranslatef(car_pos[0], car_pos[1], car_pos[2])
-    glRotatef(car_rotation, 0, 0, 1)
-    
-    # Car body - sleek sports car design
-    speed_ratio = abs(car_speed) / car_max_speed
-    
-    # Main body color - metallic blue to red based on speed
-    glColor3f(0.1 + speed_ratio * 0.8, 0.1, 0.8 - speed_ratio * 0.6)
-    
+# Car model - compiled once into display lists at three levels of detail
+CAR_LOD_HIGH = 0
+CAR_LOD_MEDIUM = 1
+CAR_LOD_LOW = 2
+CAR_LOD_DISTANCES = (400, 1200)  # Camera distance where medium / low detail take over
+car_model = None  # Display list ids, built on first draw once a GL context exists
+
+def emit_car_body(lod):
+    """Body panels - drawn in whatever colour is current so paint can vary per car"""
     # Main chassis - low and wide like a Lamborghini
     glPushMatrix()
     glScalef(2.2, 1.5, 0.3)
     glutSolidCube(25)
     glPopMatrix()
     
+    if lod == CAR_LOD_LOW:
+        return
+    
     # Front hood - sloped aerodynamic
     glPushMatrix()
     glTranslatef(20, 0, 2)
@@ -234,7 +757,9 @@ def draw_sports_car():
     glScalef(1.5, 1.3, 0.25)
     glutSolidCube(20)
     glPopMatrix()
-    
+
+def emit_car_details(lod, quadric):
+    """Fixed-colour parts - cockpit, intakes, spoiler, wheels and lights"""
     # Cockpit - low profile windshield
     glColor3f(0.1, 0.1, 0.15)
     glPushMatrix()
@@ -245,31 +770,35 @@ def draw_sports_car():
     glPopMatrix()
     
     # Side air intakes (Lamborghini style)
-    glColor3f(0.05, 0.05, 0.05)
-    for y_side in [-15, 15]:
-        glPushMatrix()
-        glTranslatef(-5, y_side, 4)
-        glScalef(0.8, 0.2, 0.3)
-        glutSolidCube(15)
-        glPopMatrix()
+    if lod == CAR_LOD_HIGH:
+        glColor3f(0.05, 0.05, 0.05)
+        for y_side in [-15, 15]:
+            glPushMatrix()
+            glTranslatef(-5, y_side, 4)
+            glScalef(0.8, 0.2, 0.3)
+            glutSolidCube(15)
+            glPopMatrix()
     
     # Rear spoiler - large racing style
-    glColor3f(0.15, 0.15, 0.15)
-    glPushMatrix()
-    glTranslatef(-25, 0, 12)
-    glScalef(0.15, 1.8, 0.4)
-    glutSolidCube(20)
-    glPopMatrix()
-    
-    # Spoiler supports
-    for y_sup in [-12, 12]:
+    if lod != CAR_LOD_LOW:
+        glColor3f(0.15, 0.15, 0.15)
         glPushMatrix()
-        glTranslatef(-22, y_sup, 6)
-        glScalef(0.1, 0.1, 0.6)
-        glutSolidCube(15)
+        glTranslatef(-25, 0, 12)
+        glScalef(0.15, 1.8, 0.4)
+        glutSolidCube(20)
         glPopMatrix()
     
-    # Wheels - larger racing wheels
+    # Spoiler supports
+    if lod == CAR_LOD_HIGH:
+        for y_sup in [-12, 12]:
+            glPushMatrix()
+            glTranslatef(-22, y_sup, 6)
+            glScalef(0.1, 0.1, 0.6)
+            glutSolidCube(15)
+            glPopMatrix()
+    
+    # Wheels - larger racing wheels, rims only when close enough to see them
+    wheel_slices = (10, 8, 6)[lod]
     glColor3f(0.05, 0.05, 0.05)
     wheel_positions = [
         (15, -16, -2),   # Front left
@@ -282,25 +811,18 @@ def draw_sports_car():
         glPushMatrix()
         glTranslatef(x, y, z)
         glRotatef(90, 1, 0, 0)
-        # Wheel with rim detail
-        gluCylinder(gluNewQuadric(), 5, 5, 4, 10, 2)
-        # Rim center
-        glColor3f(0.7, 0.7, 0.7)
-        gluDisk(gluNewQuadric(), 0, 3, 8, 1)
-        glTranslatef(0, 0, 4)
-        gluDisk(gluNewQuadric(), 0, 3, 8, 1)
-        glColor3f(0.05, 0.05, 0.05)
+        gluCylinder(quadric, 5, 5, 4, wheel_slices, 1 if lod else 2)
+        if lod == CAR_LOD_HIGH:
+            # Rim center
+            glColor3f(0.7, 0.7, 0.7)
+            gluDisk(quadric, 0, 3, 8, 1)
+            glTranslatef(0, 0, 4)
+            gluDisk(quadric, 0, 3, 8, 1)
+            glColor3f(0.05, 0.05, 0.05)
         glPopMatrix()
     
-    # Headlights - angular sports car style
-    if car_speed > 0:
-        glColor3f(1, 1, 0.8)
-        for y in [-8, 8]:
-            glPushMatrix()
-            glTranslatef(27, y, 2)
-            glScalef(0.5, 1, 0.7)
-            glutSolidCube(5)
-            glPopMatrix()
+    if lod == CAR_LOD_LOW:
+        return
     
     # Tail lights - LED strip style
     glColor3f(0.8, 0, 0)
@@ -311,27 +833,96 @@ def draw_sports_car():
     glPopMatrix()
     
     # Front grille
-    glColor3f(0.2, 0.2, 0.2)
+    if lod == CAR_LOD_HIGH:
+        glColor3f(0.2, 0.2, 0.2)
+        glPushMatrix()
+        glTranslatef(28, 0, 0)
+        glScalef(0.1, 1.2, 0.4)
+        glutSolidCube(15)
+        glPopMatrix()
+
+def emit_car_headlights():
+    """Headlights - angular sports car style"""
+    glColor3f(1, 1, 0.8)
+    for y in [-8, 8]:
+        glPushMatrix()
+        glTranslatef(27, y, 2)
+        glScalef(0.5, 1, 0.7)
+        glutSolidCube(5)
+        glPopMatrix()
+
+def build_car_model():
+    """Compile the body, detail and headlight display lists for every LOD"""
+    global car_model
+    
+    quadric = gluNewQuadric()
+    lods = []
+    for lod in (CAR_LOD_HIGH, CAR_LOD_MEDIUM, CAR_LOD_LOW):
+        body = glGenLists(2)
+        glNewList(body, GL_COMPILE)
+        emit_car_body(lod)
+        glEndList()
+        glNewList(body + 1, GL_COMPILE)
+        emit_car_details(lod, quadric)
+        glEndList()
+        lods.append((body, body + 1))
+    gluDeleteQuadric(quadric)
+    
+    headlights = glGenLists(1)
+    glNewList(headlights, GL_COMPILE)
+    emit_car_headlights()
+    glEndList()
+    
+    car_model = {'lods': lods, 'headlights': headlights}
+
+def car_lod_for_distance(distance):
+    """Pick the level of detail for a car this far from the camera"""
+    if distance < CAR_LOD_DISTANCES[0]:
+        return CAR_LOD_HIGH
+    if distance < CAR_LOD_DISTANCES[1]:
+        return CAR_LOD_MEDIUM
+    return CAR_LOD_LOW
+
+def draw_car_model(pos, rotation, speed, lod=None):
+    """Draw a car from the prebuilt model - paint follows speed, LOD follows distance"""
+    if car_model is None:
+        build_car_model()
+    
+    if lod is None:
+        lod = car_lod_for_distance(math.sqrt((pos[0] - camera_eye[0])**2 +
+                                             (pos[1] - camera_eye[1])**2 +
+                                             (pos[2] - camera_eye[2])**2))
+    body, details = car_model['lods'][lod]
+    
     glPushMatrix()
-    glTranslatef(28, 0, 0)
-    glScalef(0.1, 1.2, 0.4)
-    glutSolidCube(15)
-    glPopMatrix()
+    glTranslatef(pos[0], pos[1], pos[2])
+    glRotatef(rotation, 0, 0, 1)
+    
+    # Main body color - metallic blue to red based on speed
+    speed_ratio = abs(speed) / car_max_speed
+    glColor3f(0.1 + speed_ratio * 0.8, 0.1, 0.8 - speed_ratio * 0.6)
+    glCallList(body)
+    glCallList(details)
+    
+    if speed > 0:
+        glCallList(car_model['headlights'])
     
     glPopMatrix()
 
+def draw_sports_car():
+    """Queue a Lamborghini/Porsche style sports car"""
+    render_queue.submit(RENDER_WORLD, OWN_COLOURS, car_pos[0], car_pos[1], car_pos[2],
+                        draw_car_model, car_pos, car_rotation, car_speed)
+
 def draw_sun():
     """Draw a sun in the sky"""
-    global sun_angle
-    sun_angle += 0.1
-    
     glPushMatrix()
-    glTranslatef(1000, 1000, 600)
+    glTranslatef(*SUN_POSITION)
     glRotatef(sun_angle, 0, 0, 1)
     
     # Sun sphere
     glColor3f(1, 0.9, 0)
-    gluSphere(gluNewQuadric(), 80, 20, 20)
+    gluSphere(get_quadric(), 80, 20, 20)
     
     # Sun rays
     glColor3f(1, 1, 0.3)
@@ -346,67 +937,46 @@ def draw_sun():
     
     glPopMatrix()
 
-def draw_clouds():
-    """Draw clouds in the sky"""
-    for cloud in clouds:
-        glPushMatrix()
-        glTranslatef(cloud.pos[0], cloud.pos[1], cloud.pos[2])
-        
-        glColor3f(1, 1, 1)
-        # Cloud made of multiple spheres
-        for i in range(3):
-            glPushMatrix()
-            glTranslatef(i * cloud.size * 0.6, 0, 0)
-            gluSphere(gluNewQuadric(), cloud.size, 10, 10)
-            glPopMatrix()
-        
-        glPushMatrix()
-        glTranslatef(cloud.size * 0.3, 0, cloud.size * 0.3)
-        gluSphere(gluNewQuadric(), cloud.size * 0.8, 10, 10)
-        glPopMatrix()
-        
-        glPopMatrix()
-        cloud.update()
-
-def draw_realistic_tree(x, y):
-    """Draw a more realistic tree"""
-    glPushMatrix()
-    glTranslatef(x, y, 0)
-    
-    # Tree trunk - brown cylinder
-    glColor3f(0.4, 0.2, 0.05)
+def draw_cloud(n):
+    """Draw one cloud"""
+    size = clouds.radius[n]
     glPushMatrix()
-    glRotatef(-90, 1, 0, 0)
-    gluCylinder(gluNewQuadric(), 8, 6, 50, 8, 8)
-    glPopMatrix()
+    glTranslatef(clouds.x[n], clouds.y[n], clouds.z[n])
     
-    # Tree foliage - multiple green spheres for fuller look
-    glColor3f(0, 0.5, 0)
+    glColor3f(1, 1, 1)
+    # Cloud made of multiple spheres
+    for i in range(3):
+        glPushMatrix()
+        glTranslatef(i * size * 0.6, 0, 0)
+        gluSphere(get_quadric(), size, 10, 10)
+        glPopMatrix()
     
-    # Main foliage
     glPushMatrix()
-    glTranslatef(0, 0, 50)
-    gluSphere(gluNewQuadric(), 25, 10, 10)
+    glTranslatef(size * 0.3, 0, size * 0.3)
+    gluSphere(get_quadric(), size * 0.8, 10, 10)
     glPopMatrix()
     
-    # Additional foliage layers
-    glColor3f(0, 0.6, 0)
-    glPushMatrix()
-    glTranslatef(10, 0, 45)
-    gluSphere(gluNewQuadric(), 15, 8, 8)
     glPopMatrix()
+
+def draw_realistic_tree(x, y, z=0):
+    """Queue a more realistic tree"""
+    submit = render_queue.submit
     
-    glPushMatrix()
-    glTranslatef(-10, 5, 48)
-    gluSphere(gluNewQuadric(), 15, 8, 8)
-    glPopMatrix()
+    # Tree trunk - brown cylinder
+    submit(RENDER_WORLD, TRUNK_COLOUR, x, y + 25, z, draw_tree_trunk, x, y, z)
     
-    glColor3f(0, 0.4, 0)
+    # Tree foliage - multiple green spheres for fuller look
+    submit(RENDER_WORLD, FOLIAGE_COLOUR, x, y, z + 50, draw_sphere_piece, x, y, z + 50, 25, 10)
+    submit(RENDER_WORLD, FOLIAGE_LIGHT_COLOUR, x + 10, y, z + 45, draw_sphere_piece, x + 10, y, z + 45, 15, 8)
+    submit(RENDER_WORLD, FOLIAGE_LIGHT_COLOUR, x - 10, y + 5, z + 48, draw_sphere_piece, x - 10, y + 5, z + 48, 15, 8)
+    submit(RENDER_WORLD, FOLIAGE_DARK_COLOUR, x, y - 10, z + 52, draw_sphere_piece, x, y - 10, z + 52, 18, 8)
+
+def draw_tree_trunk(x, y, z):
+    """A tree trunk in the current colour"""
     glPushMatrix()
-    glTranslatef(0, -10, 52)
-    gluSphere(gluNewQuadric(), 18, 8, 8)
-    glPopMatrix()
-    
+    glTranslatef(x, y, z)
+    glRotatef(-90, 1, 0, 0)
+    gluCylinder(get_quadric(), 8, 6, 50, 8, 8)
     glPopMatrix()
 
 def draw_track():
@@ -465,6 +1035,31 @@ def draw_track():
         glVertex3f(x, y, 1)
     glEnd()
     
+    # Gravel trap and red/white kerbs, matching the surface map
+    for inner, outer, surface in TRACK_BANDS:
+        if surface == SURFACE_GRAVEL:
+            glColor3f(0.76, 0.7, 0.5)
+            glBegin(GL_QUAD_STRIP)
+            for i in range(37):
+                angle = i * 10 * math.pi / 180
+                glVertex3f(math.cos(angle) * inner, math.sin(angle) * inner, -0.5)
+                glVertex3f(math.cos(angle) * outer, math.sin(angle) * outer, -0.5)
+            glEnd()
+        elif surface == SURFACE_KERB:
+            glBegin(GL_QUADS)
+            for i in range(72):
+                if i % 2 == 0:
+                    glColor3f(0.9, 0.1, 0.1)
+                else:
+                    glColor3f(1, 1, 1)
+                a1 = i * 5 * math.pi / 180
+                a2 = (i + 1) * 5 * math.pi / 180
+                glVertex3f(math.cos(a1) * inner, math.sin(a1) * inner, 0.5)
+                glVertex3f(math.cos(a1) * outer, math.sin(a1) * outer, 0.5)
+                glVertex3f(math.cos(a2) * outer, math.sin(a2) * outer, 0.5)
+                glVertex3f(math.cos(a2) * inner, math.sin(a2) * inner, 0.5)
+            glEnd()
+    
     # Start/Finish line - checkered pattern on the straight part
     glLineWidth(8)
     # Draw at the rightmost part of the track (x=800, y around 0)
@@ -481,17 +1076,30 @@ def draw_track():
         glVertex3f(700, -40 + i * 10, 1)
         glEnd()
 
-def draw_checkpoint_arch(checkpoint_data, index):
-    """Draw a half-circle arch checkpoint perpendicular to the track direction"""
-    x, y = checkpoint_data['pos']
-    angle = checkpoint_data['angle']
+def draw_checkpoint_arch(index):
+    """Queue a half-circle arch checkpoint perpendicular to the track direction"""
+    x = checkpoints.x[index]
+    y = checkpoints.y[index]
+    angle = checkpoints.angle[index]
+    submit = render_queue.submit
     
     # Checkpoint passed - green, not passed - red
     if index < current_checkpoint or (current_lap > 1 and index == 0):
-        glColor3f(0, 1, 0)
+        colour = GATE_PASSED_COLOUR
     else:
-        glColor3f(1, 0, 0)
+        colour = GATE_AHEAD_COLOUR
+    submit(RENDER_WORLD, colour, x, y, 80, draw_arch, x, y, angle)
     
+    # Add checkpoint flag/banner on top
+    submit(RENDER_WORLD, BANNER_COLOUR, x, y, 180, draw_box_piece, x, y, 180, angle, 0.2, 1, 0.3, 40)
+    
+    # Add checkpoint number text effect
+    if index == 0:
+        # Start/Finish line gets special treatment
+        submit(RENDER_WORLD, FINISH_FLAG_COLOUR, x, y, 200, draw_box_piece, x, y, 200, angle, 0.3, 1.5, 0.2, 40)
+
+def draw_arch(x, y, angle):
+    """Pillars and half-circle of a checkpoint arch in the current colour"""
     glPushMatrix()
     glTranslatef(x, y, 0)
     # Rotate checkpoint to be perpendicular to track direction (aligned with radius)
@@ -503,7 +1111,7 @@ def draw_checkpoint_arch(checkpoint_data, index):
         glPushMatrix()
         glTranslatef(0, side, 0)  # Place pillars along Y axis (perpendicular to radius)
         glRotatef(-90, 1, 0, 0)
-        gluCylinder(gluNewQuadric(), 5, 5, 80, 8, 8)
+        gluCylinder(get_quadric(), 5, 5, 80, 8, 8)
         glPopMatrix()
     
     # Draw half-circle arch spanning across the track
@@ -531,68 +1139,343 @@ def draw_checkpoint_arch(checkpoint_data, index):
         glVertex3f(0, y_outer, z_pos)
     glEnd()
     
-    # Add checkpoint flag/banner on top
-    glColor3f(1, 1, 1)
+    glPopMatrix()
+
+def draw_obstacle(index):
+    """Queue trees or buildings"""
+    x = obstacles.x[index]
+    y = obstacles.y[index]
+    
+    if obstacles.kind[index] == KIND_TREE:
+        draw_realistic_tree(x, y)
+    else:
+        # Building base, then its windows
+        render_queue.submit(RENDER_WORLD, BUILDING_COLOUR, x, y, 0, draw_box_piece, x, y, 0, 0, 1, 1, 4, 40)
+        render_queue.submit(RENDER_WORLD, WINDOW_COLOUR, x, y - 21, 40, draw_building_windows, x, y)
+
+def draw_building_windows(x, y):
+    """A building's windows in the current colour"""
     glPushMatrix()
-    glTranslatef(0, 0, 180)
-    glScalef(0.2, 1, 0.3)
-    glutSolidCube(40)
+    glTranslatef(x, y, 0)
+    for z in [20, 40, 60]:
+        for offset in [-10, 10]:
+            glPushMatrix()
+            glTranslatef(offset, -21, z)
+            glutSolidCube(8)
+            glPopMatrix()
     glPopMatrix()
+
+# Chunked world - terrain tiles and props generated around the car on demand
+CHUNK_SIZE = 500
+CHUNK_SAMPLES = 17          # Height samples along each chunk edge (16 quads)
+CHUNK_VIEW_RADIUS = 5       # Chunks drawn around the camera focus
+CHUNK_LOAD_RADIUS = 6       # Chunks prefetched in the background around the car
+CHUNK_MEMORY_BUDGET = 8 * 1024 * 1024  # Approximate bytes of chunk data kept loaded
+CHUNK_LOD_DISTANCES = (1000, 2000)     # Camera distance where coarser terrain takes over
+CHUNK_CULL_RADIUS = CHUNK_SIZE * 0.8   # Bounding circle of a chunk and the trees on it
+TREE_CULL_RADIUS = 30   # Widest foliage sphere around the trunk
+TERRAIN_SEED = 423
+TERRAIN_FLAT_RADIUS = 1500  # Circuit area stays flat
+TERRAIN_BLEND = 500         # Distance over which hills rise beyond it
+TERRAIN_AMPLITUDE = 150
+TERRAIN_FEATURE_SIZE = 600
+
+chunks = collections.OrderedDict()  # (cx, cy) -> Chunk, least recently used first
+chunk_memory = 0
+chunk_requests = queue.Queue()
+chunk_results = queue.Queue()
+chunk_pending = set()
+chunk_loader = None
+chunk_focus = None
+frame_chunks = []  # (cx, cy, centre x, centre y, chunk or None) gathered by prepare_terrain()
+obstacle_chunks = {}  # (cx, cy) -> indices of circuit obstacles inside that chunk
+
+class Chunk:
+    def __init__(self, cx, cy):
+        self.cx = cx
+        self.cy = cy
+        self.heights = None
+        self.flat = False
+        self.props = EntityStore()  # Scenery trees, with z set to the ground height
+        self.lists = {}  # Terrain display list per LOD step, compiled on first draw
+        self.memory = 0
+
+def chunk_coords(x, y):
+    return (math.floor(x / CHUNK_SIZE), math.floor(y / CHUNK_SIZE))
+
+def lattice_noise(ix, iy, seed=TERRAIN_SEED):
+    """Deterministic pseudo-random value in [0, 1) for an integer lattice point"""
+    n = (ix * 374761393 + iy * 668265263 + seed * 144665) & 0xffffffff
+    n = ((n ^ (n >> 13)) * 1274126177) & 0xffffffff
+    return (n ^ (n >> 16)) / 4294967296.0
+
+def terrain_noise(x, y):
+    """Three octaves of smoothed value noise in [0, 1)"""
+    total = 0
+    norm = 0
+    amplitude = 1.0
+    frequency = 1.0 / TERRAIN_FEATURE_SIZE
+    for _ in range(3):
+        fx = x * frequency
+        fy = y * frequency
+        ix = math.floor(fx)
+        iy = math.floor(fy)
+        tx = fx - ix
+        ty = fy - iy
+        tx = tx * tx * (3 - 2 * tx)
+        ty = ty * ty * (3 - 2 * ty)
+        bottom = lattice_noise(ix, iy) + (lattice_noise(ix + 1, iy) - lattice_noise(ix, iy)) * tx
+        top = lattice_noise(ix, iy + 1) + (lattice_noise(ix + 1, iy + 1) - lattice_noise(ix, iy + 1)) * tx
+        total += (bottom + (top - bottom) * ty) * amplitude
+        norm += amplitude
+        amplitude *= 0.5
+        frequency *= 2
+    return total / norm
+
+def terrain_height(x, y):
+    """Procedural ground height - flat across the circuit, rolling hills beyond"""
+    distance = math.sqrt(x * x + y * y)
+    if distance <= TERRAIN_FLAT_RADIUS:
+        return 0.0
+    blend = min(1.0, (distance - TERRAIN_FLAT_RADIUS) / TERRAIN_BLEND)
+    return terrain_noise(x, y) * TERRAIN_AMPLITUDE * blend
+
+def generate_chunk(cx, cy):
+    """Build a chunk's heightmap and scenery - pure Python, safe off the main thread"""
+    chunk = Chunk(cx, cy)
+    step = CHUNK_SIZE / (CHUNK_SAMPLES - 1)
+    x0 = cx * CHUNK_SIZE
+    y0 = cy * CHUNK_SIZE
+    chunk.heights = array.array('f', [terrain_height(x0 + i * step, y0 + j * step)
+                                      for j in range(CHUNK_SAMPLES) for i in range(CHUNK_SAMPLES)])
+    chunk.flat = not any(chunk.heights)
     
-    # Add checkpoint number text effect
-    if index == 0:
-        # Start/Finish line gets special treatment
-        glColor3f(1, 0, 0)
-        glPushMatrix()
-        glTranslatef(0, 0, 200)
-        glScalef(0.3, 1.5, 0.2)
-        glutSolidCube(40)
-        glPopMatrix()
+    # Scenery trees only outside the circuit area, seeded per chunk so they never change
+    nearest_x = min(max(0, x0), x0 + CHUNK_SIZE)
+    nearest_y = min(max(0, y0), y0 + CHUNK_SIZE)
+    if math.sqrt(nearest_x**2 + nearest_y**2) > TERRAIN_FLAT_RADIUS:
+        rng = random.Random(int(lattice_noise(cx, cy) * 2**32))
+        for _ in range(rng.randint(2, 6)):
+            x = x0 + rng.uniform(0, CHUNK_SIZE)
+            y = y0 + rng.uniform(0, CHUNK_SIZE)
+            chunk.props.add(KIND_TREE, x, y, terrain_height(x, y), radius=20)
     
-    glPopMatrix()
+    chunk.memory = len(chunk.heights) * chunk.heights.itemsize + chunk.props.memory()
+    return chunk
 
-def draw_obstacle(obstacle):
-    """Draw trees or buildings"""
-    x, y = obstacle['pos']
+def chunk_loader_loop():
+    while True:
+        coords = chunk_requests.get()
+        chunk_results.put(generate_chunk(*coords))
+
+def request_chunk(coords):
+    """Queue a chunk for background generation"""
+    global chunk_loader
     
-    if obstacle['type'] == 'tree':
-        draw_realistic_tree(x, y)
+    if coords in chunks or coords in chunk_pending:
+        return
+    if chunk_loader is None:
+        chunk_loader = threading.Thread(target=chunk_loader_loop, name='chunk-loader', daemon=True)
+        chunk_loader.start()
+    chunk_pending.add(coords)
+    chunk_requests.put(coords)
+
+def store_chunk(chunk):
+    """Make a chunk resident and evict the least recently used ones over budget"""
+    global chunk_memory
+    
+    coords = (chunk.cx, chunk.cy)
+    chunk_pending.discard(coords)
+    if coords in chunks:
+        return chunks[coords]
+    chunks[coords] = chunk
+    chunk_memory += chunk.memory
+    evict_chunks()
+    return chunk
+
+def evict_chunks():
+    """Drop least recently used chunks until the resident set fits the budget"""
+    global chunk_memory
+    
+    while chunk_memory > CHUNK_MEMORY_BUDGET and len(chunks) > 1:
+        _, old = chunks.popitem(last=False)
+        chunk_memory -= old.memory
+        for list_id in old.lists.values():
+            glDeleteLists(list_id, 1)
+
+def get_chunk(cx, cy):
+    """Resident chunk at (cx, cy), generated synchronously if it is not loaded yet"""
+    chunk = chunks.get((cx, cy))
+    if chunk is None:
+        chunk = store_chunk(generate_chunk(cx, cy))
     else:
-        # Building
-        glPushMatrix()
-        glTranslatef(x, y, 0)
+        chunks.move_to_end((cx, cy))
+    return chunk
+
+def update_chunks(x, y, others=()):
+    """Adopt finished background chunks and prefetch around (x, y) and any other
+    (x, y) points, such as the other split-screen cars - main thread only"""
+    global chunk_focus
+    
+    while not chunk_results.empty():
+        store_chunk(chunk_results.get_nowait())
+    evict_chunks()
+    
+    focus = tuple(chunk_coords(px, py) for px, py in [(x, y)] + list(others))
+    if focus == chunk_focus:
+        return
+    chunk_focus = focus
+    
+    # Nearest chunks first so the ground under the car arrives before the horizon
+    ring = sorted(itertools.product(range(-CHUNK_LOAD_RADIUS, CHUNK_LOAD_RADIUS + 1), repeat=2),
+                  key=lambda offset: offset[0]**2 + offset[1]**2)
+    for dx, dy in ring:
+        for fx, fy in focus:
+            request_chunk((fx + dx, fy + dy))
+
+def ground_height(x, y):
+    """Terrain height at (x, y), interpolated from the cached chunk heightmap"""
+    cx, cy = chunk_coords(x, y)
+    chunk = get_chunk(cx, cy)
+    if chunk.flat:
+        return 0.0
+    
+    step = CHUNK_SIZE / (CHUNK_SAMPLES - 1)
+    fx = min((x - cx * CHUNK_SIZE) / step, CHUNK_SAMPLES - 1.001)
+    fy = min((y - cy * CHUNK_SIZE) / step, CHUNK_SAMPLES - 1.001)
+    i = int(fx)
+    j = int(fy)
+    tx = fx - i
+    ty = fy - j
+    
+    heights = chunk.heights
+    row = j * CHUNK_SAMPLES + i
+    bottom = heights[row] + (heights[row + 1] - heights[row]) * tx
+    top = heights[row + CHUNK_SAMPLES] + (heights[row + CHUNK_SAMPLES + 1] - heights[row + CHUNK_SAMPLES]) * tx
+    return bottom + (top - bottom) * ty
+
+def index_obstacles():
+    """Group the circuit obstacles by chunk for local collision checks"""
+    obstacle_chunks.clear()
+    for i in range(len(obstacles)):
+        coords = chunk_coords(obstacles.x[i], obstacles.y[i])
+        obstacle_chunks.setdefault(coords, array.array('I')).append(i)
+
+def obstacles_near(x, y):
+    """(store, indices) for circuit obstacles and chunk scenery in the 3x3 chunks around (x, y)"""
+    cx, cy = chunk_coords(x, y)
+    nearby = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            coords = (cx + dx, cy + dy)
+            if coords in obstacle_chunks:
+                nearby.append((obstacles, obstacle_chunks[coords]))
+            props = get_chunk(*coords).props
+            if len(props):
+                nearby.append((props, range(len(props))))
+    return nearby
+
+def compile_chunk_terrain(chunk, stride):
+    """Display list for a chunk's terrain, sampling every stride-th height"""
+    list_id = glGenLists(1)
+    glNewList(list_id, GL_COMPILE)
+    x0 = chunk.cx * CHUNK_SIZE
+    y0 = chunk.cy * CHUNK_SIZE
+    
+    if chunk.flat:
+        # Same two-tone grass as the original single ground quad
+        glBegin(GL_QUADS)
+        glColor3f(0.1, 0.5, 0.1)
+        glVertex3f(x0, y0, -1)
+        glColor3f(0.1, 0.4, 0.1)
+        glVertex3f(x0 + CHUNK_SIZE, y0, -1)
+        glColor3f(0.1, 0.5, 0.1)
+        glVertex3f(x0 + CHUNK_SIZE, y0 + CHUNK_SIZE, -1)
+        glColor3f(0.1, 0.4, 0.1)
+        glVertex3f(x0, y0 + CHUNK_SIZE, -1)
+        glEnd()
+    else:
+        step = CHUNK_SIZE / (CHUNK_SAMPLES - 1)
+        for j in range(0, CHUNK_SAMPLES - 1, stride):
+            glBegin(GL_QUAD_STRIP)
+            for i in range(0, CHUNK_SAMPLES, stride):
+                for row in (j, j + stride):
+                    h = chunk.heights[row * CHUNK_SAMPLES + i]
+                    shade = h / TERRAIN_AMPLITUDE
+                    glColor3f(0.1 + shade * 0.3, 0.45 + shade * 0.15, 0.1)
+                    glVertex3f(x0 + i * step, y0 + row * step, h - 1)
+            glEnd()
+    
+    glEndList()
+    return list_id
+
+def prepare_terrain(points):
+    """Gather the chunks around every focus point once per frame, requesting missing ones"""
+    coords = set()
+    for x, y in points:
+        fcx, fcy = chunk_coords(x, y)
+        coords.update(itertools.product(range(fcx - CHUNK_VIEW_RADIUS, fcx + CHUNK_VIEW_RADIUS + 1),
+                                        range(fcy - CHUNK_VIEW_RADIUS, fcy + CHUNK_VIEW_RADIUS + 1)))
+    frame_chunks.clear()
+    for cx, cy in sorted(coords):
+        chunk = chunks.get((cx, cy))
+        if chunk is None:
+            request_chunk((cx, cy))
+        frame_chunks.append((cx, cy, (cx + 0.5) * CHUNK_SIZE, (cy + 0.5) * CHUNK_SIZE, chunk))
+
+def draw_terrain(focus_x, focus_y):
+    """Draw the frame's chunks around the focus point that the camera can see, coarser with distance"""
+    global chunk_memory
+    
+    fcx, fcy = chunk_coords(focus_x, focus_y)
+    for cx, cy, centre_x, centre_y, chunk in frame_chunks:
+        if abs(cx - fcx) > CHUNK_VIEW_RADIUS or abs(cy - fcy) > CHUNK_VIEW_RADIUS:
+            continue  # Around another player's car
+        if not in_view(centre_x, centre_y, CHUNK_CULL_RADIUS):
+            continue
+        if chunk is None:
+            # Still loading - a flat placeholder tile hides the gap
+            x0 = cx * CHUNK_SIZE
+            y0 = cy * CHUNK_SIZE
+            glColor3f(0.1, 0.45, 0.1)
+            glBegin(GL_QUADS)
+            glVertex3f(x0, y0, -1)
+            glVertex3f(x0 + CHUNK_SIZE, y0, -1)
+            glVertex3f(x0 + CHUNK_SIZE, y0 + CHUNK_SIZE, -1)
+            glVertex3f(x0, y0 + CHUNK_SIZE, -1)
+            glEnd()
+            continue
         
-        # Building base
-        glColor3f(0.6, 0.6, 0.7)
-        glPushMatrix()
-        glScalef(1, 1, 4)
-        glutSolidCube(40)
-        glPopMatrix()
+        distance = math.sqrt((centre_x - camera_eye[0])**2 + (centre_y - camera_eye[1])**2)
+        if distance < CHUNK_LOD_DISTANCES[0]:
+            stride = 1
+        elif distance < CHUNK_LOD_DISTANCES[1]:
+            stride = 2
+        else:
+            stride = 4
+        if chunk.flat:
+            stride = 1  # A flat chunk is one quad at every LOD
         
-        # Windows
-        glColor3f(0.2, 0.2, 0.8)
-        for z in [20, 40, 60]:
-            for offset in [-10, 10]:
-                glPushMatrix()
-                glTranslatef(offset, -21, z)
-                glutSolidCube(8)
-                glPopMatrix()
+        if stride not in chunk.lists:
+            chunk.lists[stride] = compile_chunk_terrain(chunk, stride)
+            # Rough driver-side cost: colour + vertex per sample in the strip
+            size = 128 if chunk.flat else ((CHUNK_SAMPLES - 1) // stride + 1)**2 * 2 * 28
+            chunk.memory += size
+            chunk_memory += size
+        glCallList(chunk.lists[stride])
         
-        glPopMatrix()
+        props = chunk.props
+        for i in range(len(props)):
+            if in_view(props.x[i], props.y[i], TREE_CULL_RADIUS):
+                draw_realistic_tree(props.x[i], props.y[i], props.z[i])
 
 def draw_environment():
     """Draw grass and environment"""
-    # Grass terrain with gradient
-    glBegin(GL_QUADS)
-    glColor3f(0.1, 0.5, 0.1)
-    glVertex3f(-GRID_LENGTH, -GRID_LENGTH, -1)
-    glColor3f(0.1, 0.4, 0.1)
-    glVertex3f(GRID_LENGTH, -GRID_LENGTH, -1)
-    glColor3f(0.1, 0.5, 0.1)
-    glVertex3f(GRID_LENGTH, GRID_LENGTH, -1)
-    glColor3f(0.1, 0.4, 0.1)
-    glVertex3f(-GRID_LENGTH, GRID_LENGTH, -1)
-    glEnd()
+    # Terrain chunks around the car while racing, around the circuit otherwise
+    if game_state == GAME_STATE_RACING:
+        draw_terrain(car_pos[0], car_pos[1])
+    else:
+        draw_terrain(0, 0)
     
     # Spectator stands
     for angle in [45, 135, 225, 315]:
@@ -600,116 +1483,108 @@ def draw_environment():
         x = math.cos(rad) * 1100
         y = math.sin(rad) * 1100
         
-        glPushMatrix()
-        glTranslatef(x, y, 0)
-        glRotatef(angle + 180, 0, 0, 1)
-        
-        # Stand structure
-        glColor3f(0.7, 0.7, 0.8)
-        glPushMatrix()
-        glScalef(3, 1, 1.5)
-        glutSolidCube(50)
-        glPopMatrix()
-        
-        # Stand roof
-        glColor3f(0.8, 0.2, 0.2)
-        glPushMatrix()
-        glTranslatef(0, 0, 40)
-        glScalef(3.2, 1.1, 0.2)
-        glutSolidCube(50)
-        glPopMatrix()
-        
-        glPopMatrix()
+        # Stand structure and roof
+        render_queue.submit(RENDER_WORLD, STAND_COLOUR, x, y, 0,
+                            draw_box_piece, x, y, 0, angle + 180, 3, 1, 1.5, 50)
+        render_queue.submit(RENDER_WORLD, STAND_ROOF_COLOUR, x, y, 40,
+                            draw_box_piece, x, y, 40, angle + 180, 3.2, 1.1, 0.2, 50)
 
 def draw_birds():
-    """Draw animated birds"""
-    for bird in birds:
-        glPushMatrix()
-        glTranslatef(bird.pos[0], bird.pos[1], bird.pos[2])
-        
-        # Body
-        glColor3f(0.2, 0.2, 0.2)
-        gluSphere(gluNewQuadric(), 5, 6, 6)
-        
-        # Wings
-        glColor3f(0.3, 0.3, 0.3)
-        glPushMatrix()
-        glRotatef(bird.wing_angle, 0, 1, 0)
-        glScalef(3, 0.2, 1)
-        glutSolidCube(10)
-        glPopMatrix()
-        
-        glPushMatrix()
-        glRotatef(-bird.wing_angle, 0, 1, 0)
-        glScalef(3, 0.2, 1)
-        glutSolidCube(10)
-        glPopMatrix()
-        
-        glPopMatrix()
-        bird.update()
+    """Queue animated birds"""
+    submit = render_queue.submit
+    for i in range(len(birds)):
+        x, y, z = birds.x[i], birds.y[i], birds.z[i]
+        submit(RENDER_WORLD, BIRD_COLOUR, x, y, z, draw_sphere_piece, x, y, z, 5, 6)
+        submit(RENDER_WORLD, WING_COLOUR, x, y, z, draw_bird_wings, x, y, z, birds.angle[i])
+
+def draw_bird_wings(x, y, z, wing_angle):
+    """A bird's flapping wings in the current colour"""
+    glPushMatrix()
+    glTranslatef(x, y, z)
+    
+    glPushMatrix()
+    glRotatef(wing_angle, 0, 1, 0)
+    glScalef(3, 0.2, 1)
+    glutSolidCube(10)
+    glPopMatrix()
+    
+    glPushMatrix()
+    glRotatef(-wing_angle, 0, 1, 0)
+    glScalef(3, 0.2, 1)
+    glutSolidCube(10)
+    glPopMatrix()
+    
+    glPopMatrix()
 
 def draw_boost_points():
-    """Draw boost pickup points"""
-    for boost in boost_points:
-        if not boost['collected']:
-            x, y = boost['pos']
-            
-            glPushMatrix()
-            glTranslatef(x, y, 20)
-            
-            # Rotating boost icon
-            glRotatef(time.time() * 100 % 360, 0, 0, 1)
-            
-            # Boost star shape
-            glColor3f(1, 1, 0)
-            glBegin(GL_TRIANGLES)
-            for i in range(8):
-                angle1 = i * 45 * math.pi / 180
-                angle2 = (i + 1) * 45 * math.pi / 180
-                
-                if i % 2 == 0:
-                    r1, r2 = 20, 10
-                else:
-                    r1, r2 = 10, 20
-                
-                glVertex3f(0, 0, 0)
-                glVertex3f(math.cos(angle1) * r1, math.sin(angle1) * r1, 0)
-                glVertex3f(math.cos(angle2) * r2, math.sin(angle2) * r2, 0)
-            glEnd()
-            
-            glPopMatrix()
+    """Queue boost pickup points"""
+    spin = time.time() * 100 % 360  # Rotating boost icon
+    for i in range(len(boost_points)):
+        if not boost_points.flags[i] & FLAG_COLLECTED:
+            x = boost_points.x[i]
+            y = boost_points.y[i]
+            render_queue.submit(RENDER_WORLD, BOOST_COLOUR, x, y, 20, draw_boost_star, x, y, spin)
+
+def draw_boost_star(x, y, spin):
+    """A boost star in the current colour"""
+    glPushMatrix()
+    glTranslatef(x, y, 20)
+    glRotatef(spin, 0, 0, 1)
+    
+    glBegin(GL_TRIANGLES)
+    for i in range(8):
+        angle1 = i * 45 * math.pi / 180
+        angle2 = (i + 1) * 45 * math.pi / 180
+        
+        if i % 2 == 0:
+            r1, r2 = 20, 10
+        else:
+            r1, r2 = 10, 20
+        
+        glVertex3f(0, 0, 0)
+        glVertex3f(math.cos(angle1) * r1, math.sin(angle1) * r1, 0)
+        glVertex3f(math.cos(angle2) * r2, math.sin(angle2) * r2, 0)
+    glEnd()
+    
+    glPopMatrix()
 
 def draw_speed_effects():
-    """Draw speed lines from the sides of the car"""
+    """Queue speed lines from the sides of the car, after everything solid"""
     if abs(car_speed) > 200:
-        glPushMatrix()
-        glTranslatef(car_pos[0], car_pos[1], car_pos[2])
-        glRotatef(car_rotation, 0, 0, 1)
-        
-        glColor4f(1, 1, 1, 0.4)
-        glLineWidth(2)
-        glBegin(GL_LINES)
-        
-        # Speed lines from the sides of the car
-        for i in range(8):
-            for side in [-20, 20]:  # Left and right sides
-                # Random variation in line position
-                y_offset = side + random.uniform(-5, 5)
-                z_offset = random.uniform(0, 15)
-                
-                # Lines streaming backwards from car sides
-                glVertex3f(20, y_offset, z_offset)  # Start near front
-                glVertex3f(-50 - random.uniform(0, 50), y_offset + random.uniform(-10, 10), z_offset)
-        
-        glEnd()
-        glPopMatrix()
+        render_queue.submit(RENDER_EFFECTS, OWN_COLOURS, car_pos[0], car_pos[1], car_pos[2],
+                            draw_speed_lines, car_pos[0], car_pos[1], car_pos[2], car_rotation)
+
+def draw_speed_lines(x, y, z, rotation):
+    """Speed lines streaming back from a car"""
+    glPushMatrix()
+    glTranslatef(x, y, z)
+    glRotatef(rotation, 0, 0, 1)
+    
+    glColor4f(1, 1, 1, 0.4)
+    glLineWidth(2)
+    glBegin(GL_LINES)
+    
+    # Speed lines from the sides of the car
+    for i in range(8):
+        for side in [-20, 20]:  # Left and right sides
+            # Random variation in line position
+            y_offset = side + random.uniform(-5, 5)
+            z_offset = random.uniform(0, 15)
+            
+            # Lines streaming backwards from car sides
+            glVertex3f(20, y_offset, z_offset)  # Start near front
+            glVertex3f(-50 - random.uniform(0, 50), y_offset + random.uniform(-10, 10), z_offset)
+    
+    glEnd()
+    glPopMatrix()
 
 def check_checkpoint():
     """Check if car passed through checkpoint"""
     global current_checkpoint, current_lap, lap_start_time, best_lap_time, game_state
     
     if current_checkpoint < len(checkpoints):
-        checkpoint_x, checkpoint_y = checkpoints[current_checkpoint]['pos']
+        checkpoint_x = checkpoints.x[current_checkpoint]
+        checkpoint_y = checkpoints.y[current_checkpoint]
         dist = math.sqrt((car_pos[0] - checkpoint_x)**2 + (car_pos[1] - checkpoint_y)**2)
         
         if dist < checkpoint_radius + 50:
@@ -717,40 +1592,50 @@ def check_checkpoint():
             
             # Completed a lap
             if current_checkpoint >= len(checkpoints):
-                lap_time = time.time() - lap_start_time
+                lap_time = clock() - lap_start_time
                 lap_times.append(lap_time)
                 
                 if lap_time < best_lap_time:
                     best_lap_time = lap_time
                 
+                # Queued for the leaderboard's writer thread - never blocks the frame. Split-screen
+                # racers share one --player name, so only single-player races are recorded
+                if leaderboard and not race_rewound and not players:
+                    leaderboard.record_lap(TRACK_ID, player_name, car_config_id(), current_lap, lap_time)
+                
                 if current_lap < total_laps:
                     current_lap += 1
                     current_checkpoint = 0
-                    lap_start_time = time.time()
+                    lap_start_time = clock()
                 else:
                     # Race finished
                     game_state = GAME_STATE_FINISHED
+                    if leaderboard and not race_rewound and not players:
+                        leaderboard.record_race(TRACK_ID, player_name, car_config_id(),
+                                                len(lap_times), sum(lap_times), best_lap_time)
 
 def check_boost_collision():
     """Check if car collected boost point"""
     global boost_active, boost_timer
     
-    for boost in boost_points:
-        if not boost['collected']:
-            x, y = boost['pos']
+    flags = boost_points.flags
+    for i in range(len(flags)):
+        if not flags[i] & FLAG_COLLECTED:
+            x = boost_points.x[i]
+            y = boost_points.y[i]
             dist = math.sqrt((car_pos[0] - x)**2 + (car_pos[1] - y)**2)
             
-            if dist < 40:
-                boost['collected'] = True
+            if dist < boost_points.radius[i]:
+                flags[i] |= FLAG_COLLECTED
                 boost_active = True
-                boost_timer = time.time() + 3  # 3 seconds boost
+                boost_timer = clock() + 3  # 3 seconds boost
 
 def check_track_position():
     """Check if car is on track"""
-    global is_off_track
+    global is_off_track, current_surface
     
-    dist_from_center = math.sqrt(car_pos[0]**2 + car_pos[1]**2)
-    is_off_track = dist_from_center < 700 or dist_from_center > 900
+    current_surface = surface_at(car_pos[0], car_pos[1])
+    is_off_track = not SURFACE_ON_TRACK[current_surface]
 
 def check_obstacle_collision():
     """Check collision with obstacles - reduce speed when off track"""
@@ -758,53 +1643,57 @@ def check_obstacle_collision():
     
     car_radius = 25  # Car's collision radius
     
-    for obstacle in obstacles:
-        x, y = obstacle['pos']
-        dist = math.sqrt((car_pos[0] - x)**2 + (car_pos[1] - y)**2)
-        
-        collision_distance = obstacle['radius'] + car_radius
-        
-        if dist < collision_distance:
-            # Calculate bounce direction - push car away from obstacle
-            if dist > 0:  # Avoid division by zero
-                push_x = (car_pos[0] - x) / dist
-                push_y = (car_pos[1] - y) / dist
-            else:
-                push_x = 1
-                push_y = 0
-            
-            # Push car outside collision radius
-            overlap = collision_distance - dist + 5  # Extra 5 units for safety
-            car_pos[0] += push_x * overlap
-            car_pos[1] += push_y * overlap
-            
-            # Significantly reduce speed when hitting obstacle off track
-            if is_off_track:
-                car_speed *= 0.2  # Heavy penalty when off track
-            else:
-                car_speed *= 0.5  # Normal penalty on track
+    for store, indices in obstacles_near(car_pos[0], car_pos[1]):
+        xs, ys, radii = store.x, store.y, store.radius
+        for i in indices:
+            x = xs[i]
+            y = ys[i]
+            dist = math.sqrt((car_pos[0] - x)**2 + (car_pos[1] - y)**2)
             
-            # Add small random rotation for realism
-            car_rotation += random.uniform(-15, 15)
+            collision_distance = radii[i] + car_radius
             
-            # Prevent car from getting stuck
-            if abs(car_speed) < 10:
-                car_speed = -20  # Give a small reverse push
+            if dist < collision_distance:
+                # Calculate bounce direction - push car away from obstacle
+                if dist > 0:  # Avoid division by zero
+                    push_x = (car_pos[0] - x) / dist
+                    push_y = (car_pos[1] - y) / dist
+                else:
+                    push_x = 1
+                    push_y = 0
+                
+                # Push car outside collision radius
+                overlap = collision_distance - dist + 5  # Extra 5 units for safety
+                car_pos[0] += push_x * overlap
+                car_pos[1] += push_y * overlap
+                
+                # Significantly reduce speed when hitting obstacle off track
+                if is_off_track:
+                    car_speed *= 0.2  # Heavy penalty when off track
+                else:
+                    car_speed *= 0.5  # Normal penalty on track
+                
+                # Add small random rotation for realism
+                car_rotation += random.uniform(-15, 15)
+                
+                # Prevent car from getting stuck
+                if abs(car_speed) < 10:
+                    car_speed = -20  # Give a small reverse push
 
 def update_car_physics():
     """Update car position and physics"""
     global car_pos, car_speed, boost_active, boost_timer, car_rotation
     
     # Check boost status
-    if boost_active and time.time() > boost_timer:
+    if boost_active and clock() > boost_timer:
         boost_active = False
     
     # Apply boost multiplier
     speed_multiplier = boost_speed_multiplier if boost_active else 1.0
     
-    # Apply off-track penalty
+    # Apply off-track penalty and the surface's own grip
     if is_off_track:
         speed_multiplier *= off_track_penalty
+    speed_multiplier *= SURFACE_SPEED[current_surface]
     
     # Handle continuous key presses
     if keys_pressed[b'w']:
@@ -833,64 +1722,186 @@ def update_car_physics():
         # Car moves forward along its facing direction (X-axis based)
         car_pos[0] += math.cos(angle_rad) * car_speed * 0.1 * speed_multiplier
         car_pos[1] += math.sin(angle_rad) * car_speed * 0.1 * speed_multiplier
+        car_pos[2] = ground_height(car_pos[0], car_pos[1]) + 5
     
     # Apply friction
     if not keys_pressed[b'w'] and not keys_pressed[b's']:
-        car_speed *= car_friction
+        car_speed *= car_friction * SURFACE_FRICTION[current_surface]
         if abs(car_speed) < 1:
             car_speed = 0
 
+# Input events - GLUT callbacks only queue timestamped events; idle() applies them
+# at the next tick boundary and showScreen() reports when their effect was presented
+INPUT_KEY_DOWN = 0
+INPUT_KEY_UP = 1
+INPUT_SPECIAL = 2
+LATENCY_BUCKETS_MS = (1, 2, 4, 8, 16, 25, 33, 50, 67, 100, 150, 250, 500, 1000)
+
+input_events = collections.deque()  # (event_id, timestamp, kind, key) waiting for a tick
+applied_events = []                 # (event_id, timestamp) applied but not yet presented
+deferred_releases = []              # Keys tapped within one tick - released on the next
+next_event_id = 0
+input_latency = None                # LatencyHistogram when instrumentation is on
+
+class LatencyHistogram:
+    """Input-to-present latencies bucketed in milliseconds"""
+    def __init__(self, label):
+        self.label = label
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)  # Last bucket is overflow
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+    
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.worst = max(self.worst, ms)
+    
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of events"""
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.worst)
+        return self.worst
+    
+    def report(self):
+        return {
+            'build': self.label,
+            'events': self.count,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.worst,
+            'buckets_ms': list(LATENCY_BUCKETS_MS),
+            'counts': self.counts,
+        }
+
+def queue_input(kind, key):
+    """Timestamp an input event and queue it for the next tick"""
+    global next_event_id
+    
+    input_events.append((next_event_id, time.perf_counter(), kind, key))
+    next_event_id += 1
+
+def process_input_events():
+    """Apply queued input in arrival order at the tick boundary"""
+    # Taps from the previous tick have now been simulated for one tick
+    for key in deferred_releases:
+        handle_key_up(key)
+    deferred_releases.clear()
+    
+    pressed_this_tick = set()
+    while input_events:
+        event_id, timestamp, kind, key = input_events.popleft()
+        if kind == INPUT_KEY_DOWN:
+            handle_key_down(key)
+            pressed_this_tick.add(key)
+            # Pressed again after a tap - it is held now, so drop the tap's pending release
+            while key in deferred_releases:
+                deferred_releases.remove(key)
+        elif kind == INPUT_KEY_UP:
+            if key in pressed_this_tick:
+                # Pressed and released between two ticks - keep it down for this one
+                deferred_releases.append(key)
+            else:
+                handle_key_up(key)
+        else:
+            handle_special_key(key)
+        if input_latency:
+            applied_events.append((event_id, timestamp))
+
+def note_present():
+    """Record input-to-present latency for every event shown in the frame just swapped"""
+    if not applied_events:
+        return
+    now = time.perf_counter()
+    for _, timestamp in applied_events:
+        input_latency.add(now - timestamp)
+    applied_events.clear()
+
+def start_input_latency(label, path):
+    """Collect input latencies and write the histogram as JSON to path on exit"""
+    global input_latency
+    
+    input_latency = LatencyHistogram(label)
+    
+    def write_report():
+        with open(path, 'w') as f:
+            json.dump(input_latency.report(), f, indent=2)
+    on_close(write_report)
+
 def keyboardListener(key, x, y):
     """Handle keyboard inputs - key press"""
-    global game_state, camera_mode
-    global race_start_time, lap_start_time, current_checkpoint, current_lap
-    global boost_points, keys_pressed, car_pos, car_rotation, car_speed
+    queue_input(INPUT_KEY_DOWN, key)
+
+def keyboardUpListener(key, x, y):
+    """Handle keyboard inputs - key release"""
+    queue_input(INPUT_KEY_UP, key)
+
+def specialKeyListener(key, x, y):
+    """Handle arrow keys"""
+    queue_input(INPUT_SPECIAL, key)
+
+def handle_key_down(key):
+    """Apply a key press"""
+    global game_state, camera_mode, race_rewound
+    global race_start_time, lap_start_time, car_pos, car_rotation
     
     if key == b' ' and game_state == GAME_STATE_START:
         game_state = GAME_STATE_RACING
-        race_start_time = time.time()
-        lap_start_time = time.time()
-        # Reset car to start position - facing along track
-        car_pos = [800, 0, 5]
-        car_rotation = 90  # Face upward along the track
+        race_start_time = clock()
+        if players:
+            reset_players(race_start_time)
+        else:
+            lap_start_time = clock()
+            # Reset car to start position - facing along track
+            car_pos = [800, 0, 5]
+            car_rotation = 90  # Face upward along the track
     
     elif game_state == GAME_STATE_RACING:
         # Record key press
-        if key in keys_pressed:
+        if players:
+            press_player_key(key, True)
+        elif key in keys_pressed:
             keys_pressed[key] = True
         
-        # Change camera
-        if key == b'c':
+        # Change camera - split-screen players each have their own camera key
+        if key == b'c' and not players:
             camera_mode = (camera_mode + 1) % 2
+        
+        # Rewind a couple of seconds, keeping whatever keys are held now
+        if key == b'b' and rewind_buffer:
+            held = dict(keys_pressed)
+            if rewind_buffer.rewind(REWIND_STEP):
+                keys_pressed.update(held)
+                race_rewound = True
     
     # Restart game
     if key == b'r':
-        # Reset everything
-        game_state = GAME_STATE_START
-        car_pos[:] = [800, 0, 5]
-        car_rotation = 90  # Face upward along the track
-        car_speed = 0
-        current_checkpoint = 0
-        current_lap = 1
-        lap_times.clear()
-        best_lap_time = float('inf')
-        
-        # Reset key states
-        for k in keys_pressed:
-            keys_pressed[k] = False
-        
-        # Reset boost points
-        for boost in boost_points:
-            boost['collected'] = False
+        restore_state(start_snapshot)
+        race_rewound = False
+        if rewind_buffer:
+            rewind_buffer.clear()
+        if players:
+            reset_players()
+        race_progress.reset()  # Splits and search segments belong to the old race
 
-def keyboardUpListener(key, x, y):
-    """Handle keyboard inputs - key release"""
+def handle_key_up(key):
+    """Apply a key release"""
     global keys_pressed
     
-    if key in keys_pressed:
+    if players:
+        press_player_key(key, False)
+    elif key in keys_pressed:
         keys_pressed[key] = False
 
-def specialKeyListener(key, x, y):
+def handle_special_key(key):
     """Handle arrow keys for camera adjustment - fixed"""
     global fovY
     
@@ -910,13 +1921,15 @@ def mouseListener(button, state, x, y):
     """Handle mouse inputs"""
     pass
 
-def setupCamera():
+def setupCamera(aspect=None):
     """Configure camera based on mode"""
-    global camera_pos
+    global camera_pos, camera_eye, view_cone
     
+    aspect = aspect or window_width / window_height
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
-    gluPerspective(fovY, 1.25, 0.1, 3000)
+    gluPerspective(fovY, aspect, 0.1, 3000)
+    half_fov = math.atan(math.tan(math.radians(fovY) / 2) * aspect) + VIEW_CULL_MARGIN
     
     glMatrixMode(GL_MODELVIEW)
     glLoadIdentity()
@@ -939,6 +1952,8 @@ def setupCamera():
             gluLookAt(cam_x, cam_y, cam_z,
                      look_x, look_y, look_z,
                      0, 0, 1)
+            camera_eye = (cam_x, cam_y, cam_z)
+            view_cone = (cam_x, cam_y, angle_rad, half_fov)
         else:
             # Third person - behind and above car (car visible)
             angle_rad = car_rotation * math.pi / 180
@@ -954,50 +1969,544 @@ def setupCamera():
             gluLookAt(cam_x, cam_y, cam_z,
                      car_pos[0], car_pos[1], car_pos[2] + 20,
                      0, 0, 1)
+            camera_eye = (cam_x, cam_y, cam_z)
+            view_cone = (cam_x, cam_y, angle_rad, half_fov)
     else:
         # Overview camera for start/finish screens
         gluLookAt(1000, 1000, 800,
                  0, 0, 0,
                  0, 0, 1)
+        camera_eye = (1000, 1000, 800)
+        view_cone = None  # Looks down over the whole circuit
+
+def in_view(x, y, radius):
+    """Whether a circle on the ground can fall inside the camera's horizontal field of view"""
+    if view_cone is None:
+        return True
+    eye_x, eye_y, yaw, half_fov = view_cone
+    dx = x - eye_x
+    dy = y - eye_y
+    distance = math.sqrt(dx * dx + dy * dy)
+    if distance <= radius + VIEW_CULL_NEAR:
+        return True
+    return abs(wrap_angle(math.atan2(dy, dx) - yaw)) <= half_fov + math.asin(radius / distance)
 
 def idle():
     """Idle function for continuous updates"""
-    global current_time
+    global current_time, last_tick_time
+    
+    now = time.perf_counter()
+    frame_time = now - last_tick_time
+    last_tick_time = now
+    
+    process_input_events()
     
     if game_state == GAME_STATE_RACING:
-        current_time = time.time() - race_start_time
-        update_car_physics()
-        check_checkpoint()
-        check_track_position()
-        check_obstacle_collision()
-        check_boost_collision()
+        current_time = clock() - race_start_time
+        if players:
+            update_players()  # Leaves player 1 in the globals for telemetry
+        else:
+            update_car()
+        update_progress()
+        if telemetry:
+            record_telemetry(frame_time)
+        if rewind_buffer:
+            rewind_buffer.record()
+        update_chunks(car_pos[0], car_pos[1], [(x, y) for x, y, _, _ in minimap_markers()[1:]])
+    else:
+        update_chunks(0, 0)
     
     glutPostRedisplay()
 
-def showScreen():
-    """Main display function"""
+def reshape(width, height):
+    """Track the window size so viewport, aspect ratio and render target follow it"""
+    global window_width, window_height
+    
+    window_width = max(1, width)
+    window_height = max(1, height)
+    
+    # Live capture reads the whole window, so its buffers follow the size too
+    if capture and (capture.width, capture.height) != (window_width, window_height):
+        if capture.format == 'raw':
+            # A raw stream has one frame size for its whole length - hold the window at it
+            window_width, window_height = capture.width, capture.height
+            glutReshapeWindow(window_width, window_height)
+        else:
+            capture.resize(window_width, window_height)
+
+def scene_size():
+    """Pixel size the 3D scene is rendered at for the current render scale"""
+    return (max(1, int(window_width * render_scale)),
+            max(1, int(window_height * render_scale)))
+
+def begin_scene():
+    """Bind the offscreen target when rendering below native resolution"""
+    global render_target
+    
+    width, height = scene_size()
+    if render_scale >= 1.0:
+        glViewport(0, 0, window_width, window_height)
+        return
+    
+    if render_target is None:
+        render_target = {'fbo': glGenFramebuffers(1), 'color': glGenRenderbuffers(1),
+                         'depth': glGenRenderbuffers(1), 'size': None}
+    if render_target['size'] != (width, height):
+        # (Re)allocate storage only when the scaled size actually changes
+        glBindRenderbuffer(GL_RENDERBUFFER, render_target['color'])
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, render_target['depth'])
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glBindFramebuffer(GL_FRAMEBUFFER, render_target['fbo'])
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, render_target['color'])
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, render_target['depth'])
+        render_target['size'] = (width, height)
+    
+    glBindFramebuffer(GL_FRAMEBUFFER, render_target['fbo'])
+    glViewport(0, 0, width, height)
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    glLoadIdentity()
-    glViewport(0, 0, 1000, 800)
+
+def end_scene():
+    """Upscale the offscreen scene into the window"""
+    if render_scale >= 1.0:
+        return
     
-    setupCamera()
+    width, height = render_target['size']
+    glBindFramebuffer(GL_READ_FRAMEBUFFER, render_target['fbo'])
+    glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+    glBlitFramebuffer(0, 0, width, height, 0, 0, window_width, window_height,
+                      GL_COLOR_BUFFER_BIT, GL_LINEAR)
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+    glViewport(0, 0, window_width, window_height)
+
+def update_render_scale():
+    """Nudge the render scale towards the target FPS from a smoothed frame time"""
+    global render_scale, frame_time_avg, last_frame_time, frames_since_scale
     
-    # Enable depth testing
-    glEnable(GL_DEPTH_TEST)
+    now = time.perf_counter()
+    previous, last_frame_time = last_frame_time, now
+    if not target_fps or previous is None:
+        return  # The first frame has nothing to measure against
+    frame_time = now - previous
     
+    frame_time_avg = frame_time if frame_time_avg is None else frame_time_avg * 0.9 + frame_time * 0.1
+    frames_since_scale += 1
+    if frames_since_scale < RENDER_SCALE_INTERVAL:
+        return
+    frames_since_scale = 0
+    
+    budget = 1.0 / target_fps
+    if frame_time_avg > budget * 1.05 and render_scale > RENDER_SCALE_MIN:
+        render_scale = max(RENDER_SCALE_MIN, round(render_scale - RENDER_SCALE_STEP, 2))
+    elif frame_time_avg < budget * 0.8 and render_scale < 1.0:
+        render_scale = min(1.0, round(render_scale + RENDER_SCALE_STEP, 2))
+
+# Sky - the sun and clouds animate once per frame and are drawn in every view. With the sky
+# cache each of them is an impostor: rendered into its own tile of a texture from where the
+# camera is, then drawn as a textured quad at its real position, so it never looks misplaced.
+# A tile is only rendered again once the view of it has turned far enough to show, or its size
+# on screen no longer matches, so most frames composite the whole sky in one batch of quads.
+SUN_POSITION = (1000, 1000, 600)
+SUN_REACH = 140              # Sun sphere plus rays, from its centre
+SKY_TILE_SIZE = 256          # Texels per impostor tile side - anything bigger on screen is drawn directly
+SKY_TEXEL_STEP = 32          # Impostors are rendered at their screen size, rounded up to this
+SKY_ATLAS_COLUMNS = 4
+SKY_DRIFT_PIXELS = 3         # Re-render an impostor once its outline could be this far off on screen
+SKY_COLOURS = ((1, 0.9, 0), (1, 1, 1))  # Sun, clouds - tiles are cleared to these, transparent
+
+sky_cache = True   # Draw the sun and clouds as impostors (--no-sky-cache draws them every frame)
+sky_layers = {}    # View -> impostor atlas and what each tile was rendered for
+sky_bakes = 0      # Impostor tiles rendered so far
+
+def update_sky():
+    """Turn the sun and drift the clouds by one frame - once per frame, not per view"""
+    global sun_angle
+    sun_angle += 0.1
+    update_clouds()
+
+def sky_objects():
+    """(bounding centre, radius, parallax reach, spin) for the sun and then every cloud.
+    The reach is how far from the centre anything that looks different from another side is -
+    a flat coloured sphere shows the same disc from every side, so only its centre counts."""
+    objects = [(SUN_POSITION, SUN_REACH, SUN_REACH, sun_angle)]
+    for n in range(len(clouds)):
+        # Four spheres, spanning one size behind the first to 2.2 sizes ahead of it
+        size = clouds.radius[n]
+        objects.append(((clouds.x[n] + size * 0.6, clouds.y[n], clouds.z[n]), size * 1.6, size * 0.6, 0.0))
+    return objects
+
+def draw_sky_object(n):
+    """Draw the sun (0) or a cloud (1 onwards) directly"""
+    if n == 0:
+        draw_sun()
+    else:
+        draw_cloud(n - 1)
+
+def sky_drift(tile, offset, distance, reach, spin):
+    """How far, in radians of view, an impostor's outline may be from the real object now.
+    Turning the view of an object by some angle moves its outline by up to reach * angle."""
+    bx, by, bz = tile['offset']
+    turn = math.acos(max(-1.0, min(1.0, (offset[0] * bx + offset[1] * by + offset[2] * bz)
+                                   / (distance * tile['distance']))))
+    return reach / distance * (turn + math.radians(abs(spin - tile['spin'])))
+
+def bake_sky(layer, stale, viewport):
+    """Render the listed impostor tiles from the camera into the view's atlas"""
+    global sky_bakes
+    
+    framebuffer = int(glGetIntegerv(GL_FRAMEBUFFER_BINDING))
+    clear_colour = glGetFloatv(GL_COLOR_CLEAR_VALUE)
+    width = SKY_ATLAS_COLUMNS * SKY_TILE_SIZE
+    height = layer['rows'] * SKY_TILE_SIZE
+    if layer['texture'] is None:
+        layer['texture'] = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, layer['texture'])
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        layer['depth'] = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, layer['depth'])
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        layer['fbo'] = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, layer['fbo'])
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, layer['texture'], 0)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, layer['depth'])
+    
+    glBindFramebuffer(GL_FRAMEBUFFER, layer['fbo'])
+    glEnable(GL_SCISSOR_TEST)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    
+    ex, ey, ez = camera_eye
+    for n, offset, distance, radius, spin, texels in stale:
+        # Only the corner of the tile the impostor's screen size needs - filling is the slow part
+        x0 = n % SKY_ATLAS_COLUMNS * SKY_TILE_SIZE
+        y0 = n // SKY_ATLAS_COLUMNS * SKY_TILE_SIZE
+        glViewport(x0, y0, texels, texels)
+        glScissor(x0, y0, texels, texels)
+        # Transparent, but the object's colour, so filtered edges don't darken
+        glClearColor(*SKY_COLOURS[min(n, 1)], 0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        
+        # A square frustum just holding the bounding sphere
+        half_angle = math.asin(radius / distance)
+        glMatrixMode(GL_PROJECTION)
+        glLoadIdentity()
+        gluPerspective(math.degrees(2 * half_angle), 1, distance - radius, distance + radius)
+        fx, fy, fz = offset[0] / distance, offset[1] / distance, offset[2] / distance
+        ux, uy, uz = (0, 0, 1) if abs(fz) < 0.9 else (1, 0, 0)
+        glMatrixMode(GL_MODELVIEW)
+        glLoadIdentity()
+        gluLookAt(ex, ey, ez, ex + offset[0], ey + offset[1], ez + offset[2], ux, uy, uz)
+        draw_sky_object(n)
+        
+        # The quad through the centre that this view of the tile maps onto - the same
+        # side and up axes as gluLookAt, sized to the frustum at that distance
+        sx, sy, sz = fy * uz - fz * uy, fz * ux - fx * uz, fx * uy - fy * ux
+        length = math.sqrt(sx * sx + sy * sy + sz * sz)
+        sx, sy, sz = sx / length, sy / length, sz / length
+        ux, uy, uz = sy * fz - sz * fy, sz * fx - sx * fz, sx * fy - sy * fx
+        half = distance * math.tan(half_angle)
+        # Half a texel in from the edges, so filtering never reads what is next to it
+        u0, u1 = (x0 + 0.5) / width, (x0 + texels - 0.5) / width
+        v0, v1 = (y0 + 0.5) / height, (y0 + texels - 0.5) / height
+        corners = []
+        for a, b, u, v in ((-1, -1, u0, v0), (1, -1, u1, v0), (1, 1, u1, v1), (-1, 1, u0, v1)):
+            corners.append((u, v, half * (a * sx + b * ux), half * (a * sy + b * uy), half * (a * sz + b * uz)))
+        layer['tiles'][n] = {'offset': offset, 'distance': distance, 'radius': radius,
+                             'spin': spin, 'texels': texels, 'corners': corners}
+        sky_bakes += 1
+    
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glPopMatrix()
+    glDisable(GL_SCISSOR_TEST)
+    glClearColor(*clear_colour)
+    glBindFramebuffer(GL_FRAMEBUFFER, framebuffer)
+    glViewport(*viewport)
+
+def visible_sky(objects, viewport):
+    """Indices of the sky objects inside the view. The sky is mostly above it, so unlike
+    in_view() this also culls against the top and bottom, in eye space."""
+    camera = glGetFloatv(GL_MODELVIEW_MATRIX)
+    half_y = math.radians(fovY) / 2
+    half_x = math.atan(math.tan(half_y) * viewport[2] / viewport[3])
+    visible = []
+    for n, ((cx, cy, cz), radius, _, _) in enumerate(objects):
+        x, y, z = (camera[0][i] * cx + camera[1][i] * cy + camera[2][i] * cz + camera[3][i] for i in range(3))
+        if (z < radius and abs(x) * math.cos(half_x) + z * math.sin(half_x) <= radius
+                and abs(y) * math.cos(half_y) + z * math.sin(half_y) <= radius):
+            visible.append(n)
+    return visible
+
+def draw_sky():
+    """Draw the sun and clouds, from impostors re-rendered only where the view has drifted"""
+    objects = sky_objects()
+    viewport = glGetIntegerv(GL_VIEWPORT)
+    visible = visible_sky(objects, viewport)
+    if not sky_cache:
+        for n in visible:
+            draw_sky_object(n)
+        return
+    
+    view = active_player.index if active_player else 0
+    layer = sky_layers.get(view)
+    if layer is None or len(layer['tiles']) != len(objects):
+        if layer and layer['texture'] is not None:
+            glDeleteTextures([layer['texture']])
+            glDeleteRenderbuffers(1, [layer['depth']])
+            glDeleteFramebuffers(1, [layer['fbo']])
+        rows = (len(objects) + SKY_ATLAS_COLUMNS - 1) // SKY_ATLAS_COLUMNS
+        layer = sky_layers[view] = {'texture': None, 'rows': rows, 'tiles': [None] * len(objects)}
+    
+    pixels_per_radian = viewport[3] / math.radians(fovY)
+    ex, ey, ez = camera_eye
+    shown = []
+    near = []
+    stale = []
+    for n in visible:
+        (cx, cy, cz), radius, reach, spin = objects[n]
+        offset = (cx - ex, cy - ey, cz - ez)
+        distance = math.sqrt(offset[0] ** 2 + offset[1] ** 2 + offset[2] ** 2)
+        # Up close an impostor would be blurred and need rendering again nearly every frame
+        pixels = 2 * math.asin(radius / distance) * pixels_per_radian if distance > radius else math.inf
+        if pixels > SKY_TILE_SIZE:
+            near.append(n)
+            continue
+        tile = layer['tiles'][n]
+        texels = SKY_TEXEL_STEP * math.ceil(pixels / SKY_TEXEL_STEP)  # Rendered at its size on screen
+        # Stale once it has drifted, or is magnified or more than halved on screen
+        if (tile is None or tile['radius'] != radius
+                or not tile['texels'] >= texels > tile['texels'] // 2
+                or sky_drift(tile, offset, distance, reach, spin) * pixels_per_radian > SKY_DRIFT_PIXELS):
+            stale.append((n, offset, distance, radius, spin, texels))
+        shown.append(n)
+    if stale:
+        bake_sky(layer, stale, viewport)
+    
+    # Every impostor in one batch - alpha testing keeps the depth buffer to the outlines
+    if shown:
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, layer['texture'])
+        glEnable(GL_ALPHA_TEST)
+        glAlphaFunc(GL_GREATER, 0.5)
+        glColor3f(1, 1, 1)
+        glBegin(GL_QUADS)
+        for n in shown:
+            cx, cy, cz = objects[n][0]
+            for u, v, x, y, z in layer['tiles'][n]['corners']:
+                glTexCoord2f(u, v)
+                glVertex3f(cx + x, cy + y, cz + z)
+        glEnd()
+        glDisable(GL_ALPHA_TEST)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glDisable(GL_TEXTURE_2D)
+    
+    for n in near:
+        draw_sky_object(n)
+
+def draw_world():
+    """Draw the 3D scene for the current game state"""
     if game_state == GAME_STATE_START:
         # Start screen
+        draw_sky()
         draw_environment()
-        draw_sun()
-        draw_clouds()
         draw_track()
         draw_sports_car()  # Show car at starting position
         
-        for i, checkpoint in enumerate(checkpoints):
-            draw_checkpoint_arch(checkpoint, i)
-        for obstacle in obstacles:
-            draw_obstacle(obstacle)
+        for i in range(len(checkpoints)):
+            draw_checkpoint_arch(i)
+        for i in range(len(obstacles)):
+            draw_obstacle(i)
+    
+    elif game_state == GAME_STATE_RACING:
+        # Racing
+        draw_sky()
+        draw_environment()
+        draw_track()
+        draw_birds()
+        draw_boost_points()
+        
+        # Only what this view's camera can see
+        for i in range(len(checkpoints)):
+            if in_view(checkpoints.x[i], checkpoints.y[i], CHECKPOINT_CULL_RADIUS):
+                draw_checkpoint_arch(i)
+        
+        for i in range(len(obstacles)):
+            if in_view(obstacles.x[i], obstacles.y[i], obstacles.radius[i] + OBSTACLE_CULL_PAD):
+                draw_obstacle(i)
+        
+        # Only draw car if in third person view
+        if camera_mode == CAMERA_THIRD_PERSON:
+            draw_sports_car()
         
+        # The other split-screen cars
+        for player in players:
+            if player is not active_player:
+                state = player.state
+                x, y, z = state['car_pos']
+                if in_view(x, y, 40):
+                    render_queue.submit(RENDER_WORLD, OWN_COLOURS, x, y, z, draw_car_model,
+                                        state['car_pos'], state['car_rotation'], state['car_speed'])
+        
+        draw_speed_effects()
+    
+    elif game_state == GAME_STATE_FINISHED:
+        # Finish screen
+        draw_sky()
+        draw_environment()
+        draw_track()
+    
+    # Everything queued above, in colour and depth order
+    render_queue.flush()
+
+# Minimap - static layout compiled once into a display list, cars drawn on top each frame
+MINIMAP_SIZE = 180      # Panel size on the 1000x800 HUD canvas
+MINIMAP_MARGIN = 10
+MINIMAP_EXTENT = 1100   # World units from the centre shown at the panel edge
+
+layout_version = 0      # Bumped whenever init_game() rebuilds the world layout
+minimap_list = None
+minimap_version = -1
+
+def build_minimap():
+    """Compile the panel, track ribbon, checkpoints and obstacles into a display list"""
+    global minimap_list, minimap_version
+    
+    if minimap_list is None:
+        minimap_list = glGenLists(1)
+    glNewList(minimap_list, GL_COMPILE)
+    
+    # Panel background
+    glColor4f(0, 0, 0, 0.5)
+    glBegin(GL_QUADS)
+    glVertex2f(-MINIMAP_EXTENT, -MINIMAP_EXTENT)
+    glVertex2f(MINIMAP_EXTENT, -MINIMAP_EXTENT)
+    glVertex2f(MINIMAP_EXTENT, MINIMAP_EXTENT)
+    glVertex2f(-MINIMAP_EXTENT, MINIMAP_EXTENT)
+    glEnd()
+    
+    # Track ribbon from the same surface bands the physics uses
+    for inner, outer, surface in TRACK_BANDS:
+        if surface == SURFACE_ASPHALT:
+            glColor3f(0.35, 0.35, 0.35)
+        elif surface == SURFACE_GRAVEL:
+            glColor3f(0.6, 0.55, 0.4)
+        else:
+            continue
+        glBegin(GL_QUAD_STRIP)
+        for i in range(37):
+            angle = i * 10 * math.pi / 180
+            glVertex2f(math.cos(angle) * inner, math.sin(angle) * inner)
+            glVertex2f(math.cos(angle) * outer, math.sin(angle) * outer)
+        glEnd()
+    
+    glPointSize(4)
+    glBegin(GL_POINTS)
+    for i in range(len(obstacles)):
+        if obstacles.kind[i] == KIND_TREE:
+            glColor3f(0, 0.5, 0)
+        else:
+            glColor3f(0.6, 0.6, 0.7)
+        glVertex2f(obstacles.x[i], obstacles.y[i])
+    glEnd()
+    
+    # Checkpoint gates across the track
+    glColor3f(1, 1, 1)
+    glLineWidth(2)
+    glBegin(GL_LINES)
+    for i in range(len(checkpoints)):
+        x = checkpoints.x[i]
+        y = checkpoints.y[i]
+        angle = checkpoints.angle[i] * math.pi / 180
+        glVertex2f(x - math.cos(angle) * 100, y - math.sin(angle) * 100)
+        glVertex2f(x + math.cos(angle) * 100, y + math.sin(angle) * 100)
+    glEnd()
+    
+    glEndList()
+    minimap_version = layout_version
+
+def minimap_markers():
+    """(x, y, heading, colour) for every car shown on the minimap"""
+    if not players:
+        return [(car_pos[0], car_pos[1], car_rotation, PLAYER_COLOURS[0])]
+    markers = []
+    for player in players:
+        state = player_state(player)
+        markers.append((state['car_pos'][0], state['car_pos'][1], state['car_rotation'], player.colour))
+    return markers
+
+def draw_minimap():
+    """Draw the minimap panel in the HUD's bottom-right corner"""
+    if minimap_version != layout_version:
+        build_minimap()
+    
+    # Map the panel from HUD canvas coordinates to window pixels
+    scale_x = window_width / HUD_WIDTH
+    scale_y = window_height / HUD_HEIGHT
+    left = int((HUD_WIDTH - MINIMAP_SIZE - MINIMAP_MARGIN) * scale_x)
+    bottom = int(MINIMAP_MARGIN * scale_y)
+    glViewport(left, bottom, int(MINIMAP_SIZE * scale_x), int(MINIMAP_SIZE * scale_y))
+    
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    gluOrtho2D(-MINIMAP_EXTENT, MINIMAP_EXTENT, -MINIMAP_EXTENT, MINIMAP_EXTENT)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    glDisable(GL_DEPTH_TEST)
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    
+    glCallList(minimap_list)
+    
+    # Next checkpoint and remaining boosts change during the race
+    if current_checkpoint < len(checkpoints):
+        glColor3f(1, 0.8, 0)
+        glPointSize(8)
+        glBegin(GL_POINTS)
+        glVertex2f(checkpoints.x[current_checkpoint], checkpoints.y[current_checkpoint])
+        glEnd()
+    glColor3f(1, 1, 0)
+    glPointSize(5)
+    glBegin(GL_POINTS)
+    for i in range(len(boost_points)):
+        if not boost_points.flags[i] & FLAG_COLLECTED:
+            glVertex2f(boost_points.x[i], boost_points.y[i])
+    glEnd()
+    
+    # Car arrows
+    glBegin(GL_TRIANGLES)
+    for x, y, heading, colour in minimap_markers():
+        angle = heading * math.pi / 180
+        glColor3f(*colour)
+        glVertex2f(x + math.cos(angle) * 70, y + math.sin(angle) * 70)
+        glVertex2f(x + math.cos(angle + 2.5) * 45, y + math.sin(angle + 2.5) * 45)
+        glVertex2f(x + math.cos(angle - 2.5) * 45, y + math.sin(angle - 2.5) * 45)
+    glEnd()
+    
+    glDisable(GL_BLEND)
+    glEnable(GL_DEPTH_TEST)
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glViewport(0, 0, window_width, window_height)
+
+def lap_time_text(seconds):
+    """Whole seconds for the HUD, or a dash before the first lap is done"""
+    return f"{int(seconds)}s" if seconds != float('inf') else "-"
+
+def draw_hud():
+    """Draw the HUD text for the current game state at full window resolution"""
+    if game_state == GAME_STATE_START:
         draw_text(350, 500, "3D RACING CIRCUIT", GLUT_BITMAP_TIMES_ROMAN_24)
         draw_text(380, 450, "Press SPACE to Start")
         draw_text(350, 400, "Controls:")
@@ -1010,27 +2519,12 @@ def showScreen():
         draw_text(350, 180, "Complete 3 laps to win!")
         draw_text(350, 150, "Collect yellow boosts for speed!")
         draw_text(350, 120, "Rating: <60s Excellent, <90s Good")
+        if players:
+            draw_text(350, 90, "Players: " + "  ".join(
+                f"P{player.index + 1} {PLAYER_KEY_NAMES[player.index]}" for player in players))
         
     elif game_state == GAME_STATE_RACING:
-        # Racing
-        draw_environment()
-        draw_sun()
-        draw_clouds()
-        draw_track()
-        draw_birds()
-        draw_boost_points()
-        
-        for i, checkpoint in enumerate(checkpoints):
-            draw_checkpoint_arch(checkpoint, i)
-        
-        for obstacle in obstacles:
-            draw_obstacle(obstacle)
-        
-        # Only draw car if in third person view
-        if camera_mode == CAMERA_THIRD_PERSON:
-            draw_sports_car()
-        
-        draw_speed_effects()
+        draw_minimap()
         
         # HUD
         draw_text(10, 770, f"Lap: {current_lap}/{total_laps}")
@@ -1041,10 +2535,25 @@ def showScreen():
         if best_lap_time != float('inf'):
             draw_text(10, 650, f"Best Lap: {int(best_lap_time)}s")
         
+        if leaderboard:
+            personal_best = leaderboard.personal_best(TRACK_ID, player_name, car_config_id())
+            if personal_best is not None:
+                draw_text(200, 650, f"PB: {personal_best:.2f}s")
+        
         # Camera mode indicator
         camera_text = "Camera: First Person" if camera_mode == CAMERA_FIRST_PERSON else "Camera: Third Person"
         draw_text(10, 620, camera_text)
         
+        if render_scale < 1.0:
+            draw_text(10, 590, f"Render: {int(render_scale * 100)}%")
+        
+        # Race distance covered and the time at the last checkpoint
+        progress = race_progress.cars.get(0)
+        if progress:
+            draw_text(800, 770, f"Race: {int(race_progress.fraction(0) * 100)}%")
+            if progress.splits:
+                draw_text(800, 740, f"Split {len(progress.splits)}: {progress.splits[-1]:.2f}s")
+        
         if is_off_track:
             draw_text(400, 400, "OFF TRACK!", GLUT_BITMAP_TIMES_ROMAN_24)
         
@@ -1058,13 +2567,9 @@ def showScreen():
             draw_text(450, 70, "KM/H")
     
     elif game_state == GAME_STATE_FINISHED:
-        # Finish screen
-        draw_environment()
-        draw_sun()
-        draw_clouds()
-        draw_track()
-        
-        total_time = sum(lap_times)
+        # Split-screen shows the winner's race - player 1's globals may belong to a loser
+        results = player_state(race_winner) if race_winner else globals()
+        total_time = sum(results['lap_times'])
         # Updated rating system: Excellent < 60s, Good < 90s, Try Again > 100s
         if total_time < 60:
             rating = "Excellent!"
@@ -1074,22 +2579,1740 @@ def showScreen():
             rating = "Try Again!"
         
         draw_text(350, 500, "RACE FINISHED!", GLUT_BITMAP_TIMES_ROMAN_24)
+        if race_winner:
+            draw_text(350, 560, f"P{race_winner.index + 1} WINS!", GLUT_BITMAP_TIMES_ROMAN_24)
+            # Finishing order from the race progress service
+            for i, index in enumerate(race_progress.order):
+                state = player_state(players[index])
+                draw_text(650, 320 - i * 30, f"{i + 1}. P{index + 1}: {len(state['lap_times'])} laps, "
+                                             f"best {lap_time_text(state['best_lap_time'])}")
         draw_text(350, 450, f"Total Time: {int(total_time)}s")
-        draw_text(350, 420, f"Best Lap: {int(best_lap_time)}s")
+        draw_text(350, 420, f"Best Lap: {lap_time_text(results['best_lap_time'])}")
         draw_text(350, 390, f"Rating: {rating}")
         draw_text(350, 350, "Lap Times:")
         
-        for i, lap_time in enumerate(lap_times):
+        for i, lap_time in enumerate(results['lap_times']):
             draw_text(350, 320 - i * 30, f"  Lap {i + 1}: {int(lap_time)}s")
         
+        if leaderboard:
+            draw_text(650, 500, "Fastest Races:")
+            top_races = leaderboard.top_races(TRACK_ID, car_config_id())
+            for i, (name, race_time) in enumerate(top_races[:5]):
+                draw_text(650, 470 - i * 30, f"{i + 1}. {name} {race_time:.2f}s")
+        
         draw_text(350, 200, "Press R to Restart")
+
+# Split-screen - each player owns a copy of the per-car globals, swapped in while it is
+# simulated or viewed, so the single-player code runs unchanged for every car
+MAX_PLAYERS = 4
+PLAYER_KEYMAPS = (      # Physical key -> the game key it stands for (c toggles that player's camera)
+    {b'w': b'w', b's': b's', b'a': b'a', b'd': b'd', b'c': b'c'},
+    {b'i': b'w', b'k': b's', b'j': b'a', b'l': b'd', b'm': b'c'},
+    {b't': b'w', b'g': b's', b'f': b'a', b'h': b'd', b'v': b'c'},
+    {b'8': b'w', b'5': b's', b'4': b'a', b'6': b'd', b'0': b'c'},
+)
+PLAYER_KEY_NAMES = ('WASD', 'IJKL', 'TFGH', '8456')
+PLAYER_COLOURS = ((1, 0.2, 0.2), (0.2, 0.5, 1), (0.2, 0.9, 0.2), (1, 0.8, 0.1))
+PLAYER_GRID_X = (725, 775, 825, 875)  # Start positions side by side across the track
+PLAYER_STATE = ('car_pos', 'car_rotation', 'car_speed', 'current_checkpoint', 'current_lap',
+                'lap_times', 'best_lap_time', 'lap_start_time', 'boost_active', 'boost_timer',
+                'is_off_track', 'current_surface', 'keys_pressed', 'camera_mode')
+
+player_count = 1
+players = []            # Split-screen players - empty in single-player
+active_player = None    # Whose state is in the globals right now
+race_winner = None
+
+class Player:
+    """One split-screen racer and its saved per-car state"""
+    def __init__(self, index):
+        self.index = index
+        self.keymap = PLAYER_KEYMAPS[index]
+        self.colour = PLAYER_COLOURS[index]
+        self.hud = []   # HUD lines, prepared once per frame
+        self.reset()
+    
+    def reset(self, start_time=0):
+        """Line the car up on the grid with fresh timing"""
+        self.state = {
+            'car_pos': [PLAYER_GRID_X[self.index], 0, 5], 'car_rotation': 90, 'car_speed': 0,
+            'current_checkpoint': 0, 'current_lap': 1, 'lap_times': [], 'best_lap_time': float('inf'),
+            'lap_start_time': start_time, 'boost_active': False, 'boost_timer': 0, 'is_off_track': False,
+            'current_surface': SURFACE_ASPHALT, 'keys_pressed': dict.fromkeys(SNAPSHOT_KEYS, False),
+            'camera_mode': CAMERA_THIRD_PERSON,
+        }
+
+def start_players(count):
+    """Switch to split-screen with count players"""
+    players[:] = [Player(i) for i in range(count)]
+    reset_players()
+
+def activate_player(player):
+    """Save the active player's globals and swap in this player's"""
+    global active_player
+    
+    if player is active_player:
+        return
+    namespace = globals()
+    if active_player is not None:
+        for name in PLAYER_STATE:
+            active_player.state[name] = namespace[name]
+    namespace.update(player.state)
+    active_player = player
+
+def reset_players(start_time=0):
+    """Put every car back on the grid"""
+    global active_player, race_winner
+    
+    for player in players:
+        player.reset(start_time)
+    active_player = None  # The globals belong to nobody until the next swap
+    race_winner = None
+    activate_player(players[0])
+
+def player_state(player):
+    """A player's per-car values - the globals themselves while it is active"""
+    return globals() if player is active_player else player.state
+
+def press_player_key(key, down):
+    """Route a driving or camera key to the player whose keymap owns it"""
+    for player in players:
+        if key in player.keymap:
+            state = player_state(player)
+            game_key = player.keymap[key]
+            if game_key == b'c':
+                if down:
+                    state['camera_mode'] = (state['camera_mode'] + 1) % 2
+            else:
+                state['keys_pressed'][game_key] = down
+
+def update_car():
+    """One tick of physics and checks for the car in the globals"""
+    update_car_physics()
+    check_checkpoint()
+    check_track_position()
+    check_obstacle_collision()
+    check_boost_collision()
+
+def update_players():
+    """One tick for every split-screen car - the first to finish ends the race"""
+    global race_winner
+    
+    for player in players:
+        activate_player(player)
+        update_car()
+        if game_state != GAME_STATE_RACING:
+            race_winner = player
+            break
+    activate_player(players[0])
+
+def split_rects(count, width, height):
+    """(x, y, w, h) of each player's view, player 1 at the top left"""
+    if count == 1:
+        return [(0, 0, width, height)]
+    half_height = height // 2
+    if count == 2:
+        return [(0, height - half_height, width, half_height), (0, 0, width, height - half_height)]
+    half_width = width // 2
+    return [(0, height - half_height, half_width, half_height),
+            (half_width, height - half_height, width - half_width, half_height),
+            (0, 0, half_width, height - half_height),
+            (half_width, 0, width - half_width, height - half_height)][:count]
+
+def prepare_frame():
+    """Per-frame work shared by every view: entity updates, terrain gathering and HUD text"""
+    update_sky()
+    if game_state != GAME_STATE_RACING:
+        prepare_terrain([(0, 0)])
+        return
     
+    update_birds()
+    prepare_terrain([(x, y) for x, y, _, _ in minimap_markers()])
+    for player in players:
+        state = player_state(player)
+        player.hud = [
+            f"P{player.index + 1}  Lap: {state['current_lap']}/{total_laps}",
+            f"Checkpoint: {state['current_checkpoint']}/{len(checkpoints)}",
+            f"Speed: {int(abs(state['car_speed']))} km/h",
+            f"Time: {int(current_time)}s",
+        ]
+        progress = race_progress.cars.get(player.index)
+        if progress:
+            if progress.position == 1:
+                player.hud.append(f"Pos: 1/{len(players)}  Leader")
+            elif progress.gap_time is not None:
+                player.hud.append(f"Pos: {progress.position}/{len(players)}  +{progress.gap_time:.2f}s")
+            else:
+                player.hud.append(f"Pos: {progress.position}/{len(players)}")
+        if state['best_lap_time'] != float('inf'):
+            player.hud.append(f"Best Lap: {int(state['best_lap_time'])}s")
+        if state['boost_active']:
+            player.hud.append("BOOST!")
+        if state['is_off_track']:
+            player.hud.append("OFF TRACK!")
+
+def draw_player_hud(player, rect):
+    """Draw a player's prepared HUD lines in the top-left corner of its view"""
+    x, y, width, height = rect
+    glViewport(x, y, width, height)
+    # Keep 24 pixels between lines whatever the view size
+    line = 24 * HUD_HEIGHT / height
+    left = 10 * HUD_WIDTH / width
+    for i, text in enumerate(player.hud):
+        draw_text(left, HUD_HEIGHT - line * (i + 1), text)
+
+def draw_split_views():
+    """Draw every player's view of the shared scene, then their HUDs and one minimap"""
+    width, height = scene_size()
+    scale = width / window_width
+    rects = split_rects(len(players), window_width, window_height)
+    
+    begin_scene()
+    for player, (x, y, w, h) in zip(players, rects):
+        activate_player(player)
+        glViewport(int(x * scale), int(y * scale), max(1, int(w * scale)), max(1, int(h * scale)))
+        setupCamera(w / h)
+        glEnable(GL_DEPTH_TEST)
+        draw_world()
+    end_scene()
+    
+    for player, rect in zip(players, rects):
+        draw_player_hud(player, rect)
+    glViewport(0, 0, window_width, window_height)
+    activate_player(players[0])
+    draw_minimap()
+
+# Race progress - continuous race distance from a centreline lookup table, for ranking cars,
+# gaps and split times. Any (x, y) is projected onto the nearest centreline segment, searching
+# outwards from the segment the car was on last tick, so a query costs a couple of projections.
+PROGRESS_SEGMENTS = 360     # Centreline segments in the lookup table
+TRACK_CENTRE_RADIUS = 800
+
+race_progress = None        # RaceProgress for the current layout, built by init_game()
+
+def track_centreline(segments=PROGRESS_SEGMENTS):
+    """Centreline points in driving order, starting on the start/finish line"""
+    return [(math.cos(2 * math.pi * i / segments) * TRACK_CENTRE_RADIUS,
+             math.sin(2 * math.pi * i / segments) * TRACK_CENTRE_RADIUS) for i in range(segments)]
+
+class CarProgress:
+    """Where one car is in the race"""
+    def __init__(self):
+        self.segment = None     # Centreline segment found last tick - the next search starts here
+        self.distance = 0.0     # Race distance from the start line
+        self.passed = 0         # Checkpoints passed so far
+        self.splits = []        # Race time at each checkpoint passed, in passing order
+        self.finish_time = None
+        self.position = 1
+        self.gap = 0.0          # Race distance behind the leader
+        self.gap_time = None    # Seconds behind the leader at the last checkpoint this car passed
+
+class RaceProgress:
+    """Maps car positions to race distance and ranks every car each tick"""
+    def __init__(self, centreline, checkpoint_points):
+        count = len(centreline)
+        self.xs = array.array('d', (x for x, _ in centreline))
+        self.ys = array.array('d', (y for _, y in centreline))
+        self.dx = array.array('d', (self.xs[(i + 1) % count] - self.xs[i] for i in range(count)))
+        self.dy = array.array('d', (self.ys[(i + 1) % count] - self.ys[i] for i in range(count)))
+        self.length2 = array.array('d', (dx * dx + dy * dy for dx, dy in zip(self.dx, self.dy)))
+        self.start = array.array('d', [0.0] * count)  # Lap distance where each segment begins
+        for i in range(1, count):
+            self.start[i] = self.start[i - 1] + math.sqrt(self.length2[i - 1])
+        self.lap_length = self.start[-1] + math.sqrt(self.length2[-1])
+        self.checkpoint_distances = [self.lap_distance(x, y)[0] for x, y in checkpoint_points]
+        self.cars = {}          # Car id -> CarProgress
+        self.order = []         # Car ids, leader first
+    
+    def project(self, x, y, segment):
+        """Squared distance from (x, y) to a segment and the fraction along it"""
+        px = x - self.xs[segment]
+        py = y - self.ys[segment]
+        t = min(1.0, max(0.0, (px * self.dx[segment] + py * self.dy[segment]) / self.length2[segment]))
+        ex = px - t * self.dx[segment]
+        ey = py - t * self.dy[segment]
+        return ex * ex + ey * ey, t
+    
+    def lap_distance(self, x, y, segment=None):
+        """(distance around the lap, segment) for the centreline point nearest (x, y).
+        With a segment hint only neighbouring segments are tried; without one, all of them."""
+        count = len(self.xs)
+        if segment is None:
+            segment = min(range(count), key=lambda i: self.project(x, y, i)[0])
+            best, t = self.project(x, y, segment)
+        else:
+            best, t = self.project(x, y, segment)
+            for step in (1, -1):
+                while True:
+                    candidate = (segment + step) % count
+                    error, candidate_t = self.project(x, y, candidate)
+                    if error >= best:
+                        break
+                    segment, best, t = candidate, error, candidate_t
+        return self.start[segment] + t * math.sqrt(self.length2[segment]), segment
+    
+    def update(self, cars, race_time):
+        """Take (car id, x, y, checkpoints passed) for every car and re-rank the field"""
+        per_lap = len(self.checkpoint_distances)
+        finish_count = total_laps * per_lap
+        half_lap = self.lap_length / 2
+        
+        for car_id, x, y, passed in cars:
+            car = self.cars.get(car_id)
+            if car is None:
+                car = self.cars[car_id] = CarProgress()
+            if passed < len(car.splits):
+                # Restarted or rewound - forget the checkpoints it no longer has
+                del car.splits[passed:]
+                car.finish_time = None
+            while len(car.splits) < passed:
+                car.splits.append(race_time)
+            car.passed = passed
+            
+            distance, car.segment = self.lap_distance(x, y, car.segment)
+            if passed >= finish_count:
+                if car.finish_time is None:
+                    car.finish_time = race_time
+                last = finish_count - 1
+                car.distance = (last // per_lap) * self.lap_length + self.checkpoint_distances[last % per_lap]
+                continue
+            
+            # Measured back from the next checkpoint, which tells which lap the car is on.
+            # A car past a checkpoint it missed is only credited up to that checkpoint.
+            target = self.checkpoint_distances[passed % per_lap]
+            behind = (target - distance) % self.lap_length
+            if behind > half_lap:
+                behind = 0.0
+            car.distance = (passed // per_lap) * self.lap_length + target - behind
+        
+        self.order = sorted(self.cars, key=lambda car_id: self.rank_key(self.cars[car_id]))
+        leader = self.cars[self.order[0]]
+        for position, car_id in enumerate(self.order, 1):
+            car = self.cars[car_id]
+            car.position = position
+            car.gap = leader.distance - car.distance
+            last = car.passed - 1
+            car.gap_time = car.splits[last] - leader.splits[last] if 0 <= last < len(leader.splits) else None
+    
+    @staticmethod
+    def rank_key(car):
+        """Finished cars by finishing time, then everyone else by distance"""
+        if car.finish_time is not None:
+            return (0, car.finish_time)
+        return (1, -car.distance)
+    
+    def fraction(self, car_id):
+        """Share of the race distance a car has covered"""
+        per_lap = len(self.checkpoint_distances)
+        last = total_laps * per_lap - 1
+        race_length = (last // per_lap) * self.lap_length + self.checkpoint_distances[last % per_lap]
+        return min(1.0, max(0.0, self.cars[car_id].distance / race_length))
+    
+    def reset(self):
+        """Forget every car - for a restart, when the cars are back on the grid"""
+        self.cars.clear()
+        self.order = []
+
+def checkpoints_passed(lap, checkpoint):
+    """Checkpoints passed since the start, from a car's lap and next checkpoint"""
+    return (lap - 1) * len(checkpoints) + checkpoint
+
+def update_progress():
+    """Feed every car's position to the race progress service - once per simulation tick"""
+    if not players:
+        cars = [(0, car_pos[0], car_pos[1], checkpoints_passed(current_lap, current_checkpoint))]
+    else:
+        cars = []
+        for player in players:
+            state = player_state(player)
+            cars.append((player.index, state['car_pos'][0], state['car_pos'][1],
+                         checkpoints_passed(state['current_lap'], state['current_checkpoint'])))
+    race_progress.update(cars, current_time)
+
+def showScreen():
+    """Main display function"""
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    glLoadIdentity()
+    prepare_frame()
+    
+    if players and game_state == GAME_STATE_RACING:
+        draw_split_views()
+    else:
+        begin_scene()
+        setupCamera()
+        
+        # Enable depth testing
+        glEnable(GL_DEPTH_TEST)
+        draw_world()
+        end_scene()
+        
+        draw_hud()
+    
+    if capture:
+        capture.grab()
     glutSwapBuffers()
+    if input_latency:
+        note_present()
+    update_render_scale()
+    if alloc_profiler:
+        alloc_profiler.end_frame()
+
+# Telemetry - per-tick car state streamed to columnar .npy files
+TELEMETRY_COLUMNS = (
+    ('time', 'd'),        # Session clock - sum of tick times, never goes backwards
+    ('race', 'H'),        # Segment id - bumped whenever race time goes backwards (restart, rewind, next race)
+    ('race_time', 'd'),   # Seconds since race start
+    ('x', 'f'),
+    ('y', 'f'),
+    ('heading', 'f'),     # car_rotation in degrees
+    ('speed', 'f'),
+    ('off_track', 'B'),
+    ('boost', 'B'),
+    ('checkpoint', 'H'),
+    ('lap', 'H'),
+    ('frame_time', 'f'),  # Seconds since the previous tick
+)
+NPY_DTYPES = {'d': 'f8', 'f': 'f4', 'B': 'u1', 'H': 'u2'}
+NPY_HEADER_SIZE = 128  # Fixed so the shape can be patched in place on close
+TELEMETRY_VERSION = 2  # 2: 'time' is the session clock, race time moved to 'race_time'
+
+telemetry = None  # Active TelemetryRecorder, if any
+
+def npy_header(code, count):
+    """Build a fixed-size .npy v1.0 header for a 1-D column"""
+    order = '|' if code == 'B' else ('<' if sys.byteorder == 'little' else '>')
+    header = "{'descr': '%s%s', 'fortran_order': False, 'shape': (%d,), }" % (order, NPY_DTYPES[code], count)
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+class TelemetryRecorder:
+    """Ring buffer of tick records flushed in blocks by a background writer thread"""
+    def __init__(self, directory, block_size=4096, blocks=8):
+        self.directory = directory
+        self.block_size = block_size
+        self.capacity = block_size * blocks
+        self.names = [name for name, _ in TELEMETRY_COLUMNS]
+        self.columns = [array.array(code, bytes(array.array(code).itemsize * self.capacity))
+                        for _, code in TELEMETRY_COLUMNS]
+        self.head = 0      # Records written by the game loop
+        self.flushed = 0   # Records handed to disk by the writer
+        self.dropped = 0   # Records overwritten before the writer got to them
+        self.session_time = 0.0
+        self.segment = 0
+        self.last_race_time = None
+        
+        os.makedirs(directory, exist_ok=True)
+        self.files = []
+        for name, code in TELEMETRY_COLUMNS:
+            f = open(os.path.join(directory, name + '.npy'), 'wb')
+            f.write(npy_header(code, 0))
+            self.files.append(f)
+        
+        self.wakeup = threading.Event()
+        self.closing = False
+        self.writer = threading.Thread(target=self.writer_loop, name='telemetry-writer', daemon=True)
+        self.writer.start()
+    
+    def record(self, *values):
+        """Store one tick - values in TELEMETRY_COLUMNS order"""
+        i = self.head % self.capacity
+        for column, value in zip(self.columns, values):
+            column[i] = value
+        self.head += 1
+        if self.head % self.block_size == 0:
+            self.wakeup.set()
+    
+    def advance(self, frame_time, race_time):
+        """Step the session clock, starting a new segment whenever race time goes backwards"""
+        self.session_time += frame_time
+        if self.last_race_time is not None and race_time < self.last_race_time:
+            self.segment += 1
+        self.last_race_time = race_time
+        return self.session_time, self.segment
+    
+    def flush_pending(self, final=False):
+        """Write every complete block (and the partial tail when final)"""
+        head = self.head
+        end = head if final else head - head % self.block_size
+        if end - self.flushed > self.capacity:
+            # The game loop lapped the writer - skip to the oldest intact record
+            self.dropped += end - self.capacity - self.flushed
+            self.flushed = end - self.capacity
+        
+        while self.flushed < end:
+            start = self.flushed % self.capacity
+            count = min(end - self.flushed, self.capacity - start)
+            for column, f in zip(self.columns, self.files):
+                f.write(memoryview(column)[start:start + count])
+            self.flushed += count
+    
+    def writer_loop(self):
+        while not self.closing:
+            self.wakeup.wait(0.5)
+            self.wakeup.clear()
+            self.flush_pending()
+    
+    def close(self):
+        """Flush everything, patch final lengths into the headers and write meta.json"""
+        if self.closing:
+            return
+        self.closing = True
+        self.wakeup.set()
+        self.writer.join()
+        self.flush_pending(final=True)
+        
+        count = self.flushed - self.dropped
+        for (_, code), f in zip(TELEMETRY_COLUMNS, self.files):
+            f.seek(0)
+            f.write(npy_header(code, count))
+            f.close()
+        with open(os.path.join(self.directory, 'meta.json'), 'w') as f:
+            json.dump({'version': TELEMETRY_VERSION, 'columns': dict(TELEMETRY_COLUMNS),
+                       'records': count, 'dropped': self.dropped}, f, indent=2)
+
+def record_telemetry(frame_time):
+    """Log the current car state to the active recorder"""
+    session_time, segment = telemetry.advance(frame_time, current_time)
+    telemetry.record(session_time, segment, current_time, car_pos[0], car_pos[1], car_rotation,
+                     car_speed, is_off_track, boost_active, current_checkpoint, current_lap, frame_time)
+
+def start_telemetry(directory):
+    """Start recording a new session under directory and return its path"""
+    global telemetry
+    
+    session = os.path.join(directory, time.strftime('session-%Y%m%d-%H%M%S'))
+    telemetry = TelemetryRecorder(session)
+    on_close(telemetry.close)
+    return session
+
+class TelemetrySession:
+    """Lazy reader for a recorded session - columns are memory-mapped on first use"""
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version', 1) < TELEMETRY_VERSION:
+            raise ValueError(f"{directory} was recorded before race segments were added - record it again")
+        self.codes = meta['columns']
+        self.records = meta['records']
+        self.maps = {}
+    
+    def raw_column(self, name):
+        if name not in self.maps:
+            if name not in self.codes:
+                raise KeyError(f"No telemetry column named {name}")
+            with open(os.path.join(self.directory, name + '.npy'), 'rb') as f:
+                if self.records == 0:
+                    self.maps[name] = memoryview(array.array(self.codes[name]))
+                else:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self.maps[name] = memoryview(data)[NPY_HEADER_SIZE:].cast(self.codes[name])
+        return self.maps[name]
+    
+    def index_range(self, start_time=None, end_time=None):
+        """Record indices covering [start_time, end_time) of the session clock, which is monotonic"""
+        times = self.raw_column('time')
+        lo = 0 if start_time is None else bisect.bisect_left(times, start_time)
+        hi = self.records if end_time is None else bisect.bisect_left(times, end_time)
+        return lo, hi
+    
+    def column(self, name, start_time=None, end_time=None):
+        """Zero-copy view of one column, optionally limited to a time range"""
+        lo, hi = self.index_range(start_time, end_time)
+        return self.raw_column(name)[lo:hi]
+    
+    def columns(self, names, start_time=None, end_time=None):
+        lo, hi = self.index_range(start_time, end_time)
+        return {name: self.raw_column(name)[lo:hi] for name in names}
+    
+    def segments(self):
+        """(segment id, first record, end record) for each stretch of continuous race time"""
+        races = self.raw_column('race')
+        bounds = []
+        lo = 0
+        for i in range(1, self.records + 1):
+            if i == self.records or races[i] != races[lo]:
+                bounds.append((races[lo], lo, i))
+                lo = i
+        return bounds
+
+# Leaderboard - every lap and race stored in SQLite, written off the game thread
+LEADERBOARD_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'leaderboard.db')
+LEADERBOARD_TOP_N = 10
+LEADERBOARD_BATCH = 256  # Most rows written per transaction
+TRACK_ID = 'circuit'
+
+leaderboard = None  # Active Leaderboard, if any
+player_name = 'player'
+
+LEADERBOARD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS laps (
+    id INTEGER PRIMARY KEY,
+    track TEXT NOT NULL,
+    player TEXT NOT NULL,
+    car_config TEXT NOT NULL,
+    lap INTEGER NOT NULL,
+    lap_time REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS races (
+    id INTEGER PRIMARY KEY,
+    track TEXT NOT NULL,
+    player TEXT NOT NULL,
+    car_config TEXT NOT NULL,
+    laps INTEGER NOT NULL,
+    total_time REAL NOT NULL,
+    best_lap REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS laps_by_config ON laps (track, car_config, lap_time);
+CREATE INDEX IF NOT EXISTS laps_by_player ON laps (track, player, car_config, lap_time);
+CREATE INDEX IF NOT EXISTS races_by_config ON races (track, car_config, total_time);
+CREATE INDEX IF NOT EXISTS races_by_player ON races (track, player, car_config, total_time);
+"""
+
+car_config = None  # car_config_id() of the current tuning - cleared when apply_params() changes it
+
+def car_config_id():
+    """Short hash of the current car tuning, so laps are only ranked against equal cars"""
+    global car_config
+    
+    if car_config is None:
+        values = ','.join(f"{name}={globals()[name]!r}" for name in TUNABLE_PARAMS)
+        car_config = hashlib.sha1(values.encode()).hexdigest()[:12]
+    return car_config
+
+class Leaderboard:
+    """SQLite lap/race store - a writer thread owns the connection and keeps caches fresh"""
+    def __init__(self, path=LEADERBOARD_PATH, top_n=LEADERBOARD_TOP_N):
+        self.path = path
+        self.top_n = top_n
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        # Caches served to the game thread - replaced wholesale by the writer
+        self.top_lap_cache = {}    # (track, car_config) -> [(player, lap_time), ...]
+        self.top_race_cache = {}   # (track, car_config) -> [(player, total_time), ...]
+        self.best_lap_cache = {}   # (track, player, car_config) -> lap_time
+        self.error = None          # What stopped the writer, if it died
+        self.warned = False
+        self.writer = threading.Thread(target=self.writer_loop, name='leaderboard-writer', daemon=True)
+        self.writer.start()
+    
+    def submit(self, kind, row):
+        """Queue a job for the writer - False, with a warning the first time, once the writer has died"""
+        if not self.writer.is_alive():
+            if not self.warned:
+                print(f"Leaderboard writer stopped ({self.error!r}) - results are not being saved",
+                      file=sys.stderr)
+                self.warned = True
+            return False
+        self.jobs.put((kind, row))
+        return True
+    
+    def record_lap(self, track, player, car_config, lap, lap_time):
+        return self.submit('lap', (track, player, car_config, lap, lap_time, time.time()))
+    
+    def record_race(self, track, player, car_config, laps, total_time, best_lap):
+        return self.submit('race', (track, player, car_config, laps, total_time, best_lap, time.time()))
+    
+    def watch(self, track, player, car_config):
+        """Load the caches for a track/player/car ahead of time"""
+        return self.submit('refresh', (track, player, car_config))
+    
+    def top_laps(self, track, car_config):
+        with self.lock:
+            return self.top_lap_cache.get((track, car_config), [])
+    
+    def top_races(self, track, car_config):
+        with self.lock:
+            return self.top_race_cache.get((track, car_config), [])
+    
+    def personal_best(self, track, player, car_config):
+        with self.lock:
+            return self.best_lap_cache.get((track, player, car_config))
+    
+    def refresh(self, db, track, player, car_config):
+        """Re-query the cached views affected by a write"""
+        top_laps = db.execute("SELECT player, lap_time FROM laps WHERE track = ? AND car_config = ? "
+                              "ORDER BY lap_time LIMIT ?", (track, car_config, self.top_n)).fetchall()
+        top_races = db.execute("SELECT player, total_time FROM races WHERE track = ? AND car_config = ? "
+                               "ORDER BY total_time LIMIT ?", (track, car_config, self.top_n)).fetchall()
+        best = db.execute("SELECT MIN(lap_time) FROM laps WHERE track = ? AND player = ? AND car_config = ?",
+                          (track, player, car_config)).fetchone()[0]
+        with self.lock:
+            self.top_lap_cache[(track, car_config)] = top_laps
+            self.top_race_cache[(track, car_config)] = top_races
+            self.best_lap_cache[(track, player, car_config)] = best
+    
+    def writer_loop(self):
+        try:
+            self.write_jobs()
+        except Exception as error:
+            # Reported here and again by the next record_*() - the game keeps running without it
+            self.error = error
+            print(f"Leaderboard writer failed on {self.path}:", file=sys.stderr)
+            traceback.print_exc()
+    
+    def write_jobs(self):
+        """Apply queued jobs in batches until a stop job arrives"""
+        db = sqlite3.connect(self.path)
+        db.executescript(LEADERBOARD_SCHEMA)
+        running = True
+        
+        while running:
+            # Block for the first job, then take whatever else queued up as one batch
+            batch = [self.jobs.get()]
+            while len(batch) < LEADERBOARD_BATCH:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            
+            laps = [row for kind, row in batch if kind == 'lap']
+            races = [row for kind, row in batch if kind == 'race']
+            with db:
+                db.executemany("INSERT INTO laps (track, player, car_config, lap, lap_time, recorded_at) "
+                               "VALUES (?, ?, ?, ?, ?, ?)", laps)
+                db.executemany("INSERT INTO races (track, player, car_config, laps, total_time, best_lap, "
+                               "recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?)", races)
+            
+            stale = {row[:3] for row in laps + races}
+            stale.update(row for kind, row in batch if kind == 'refresh')
+            for track, player, car_config in stale:
+                self.refresh(db, track, player, car_config)
+            running = not any(kind == 'stop' for kind, _ in batch)
+        db.close()
+    
+    def close(self):
+        """Write everything still queued and stop the writer"""
+        if self.writer.is_alive():
+            self.jobs.put(('stop', None))
+            self.writer.join()
+
+def start_leaderboard(path=LEADERBOARD_PATH):
+    """Open the leaderboard and warm the caches for the current player and car"""
+    global leaderboard
+    
+    leaderboard = Leaderboard(path)
+    leaderboard.watch(TRACK_ID, player_name, car_config_id())
+    on_close(leaderboard.close)
+
+# Offscreen rendering - a software GL context with no window, for servers without a display
+EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+OFFSCREEN_LIBRARIES = {'egl': 'libEGL/libOpenGL', 'osmesa': 'libOSMesa'}
+offscreen = None  # Context handles kept alive while rendering offscreen
+
+def solid_cube(size):
+    """Stand-in for glutSolidCube, which needs a GLUT window"""
+    s = size / 2
+    faces = (
+        ((1, 0, 0), ((s, -s, -s), (s, s, -s), (s, s, s), (s, -s, s))),
+        ((-1, 0, 0), ((-s, -s, -s), (-s, -s, s), (-s, s, s), (-s, s, -s))),
+        ((0, 1, 0), ((-s, s, -s), (-s, s, s), (s, s, s), (s, s, -s))),
+        ((0, -1, 0), ((-s, -s, -s), (s, -s, -s), (s, -s, s), (-s, -s, s))),
+        ((0, 0, 1), ((-s, -s, s), (s, -s, s), (s, s, s), (-s, s, s))),
+        ((0, 0, -1), ((-s, -s, -s), (-s, s, -s), (s, s, -s), (s, -s, -s))),
+    )
+    glBegin(GL_QUADS)
+    for normal, corners in faces:
+        glNormal3f(*normal)
+        for corner in corners:
+            glVertex3f(*corner)
+    glEnd()
+
+def start_offscreen(width, height, backend='egl'):
+    """Create a windowless GL context ('egl' or 'osmesa') and make it current"""
+    global offscreen, window_width, window_height
+    
+    # PyOpenGL picks its platform at import time, so this must run before load_gl()
+    if gl_loaded:
+        raise RuntimeError("Offscreen rendering must be set up before OpenGL is loaded")
+    os.environ['PYOPENGL_PLATFORM'] = backend
+    from OpenGL import platform
+    if platform.PLATFORM.GL is None:
+        # PyOpenGL would fail later with an AttributeError on its first GL call
+        library = OFFSCREEN_LIBRARIES.get(backend, backend)
+        sys.exit(f"Could not load {library} for --offscreen {backend} - install it or try another backend")
+    load_gl()
+    
+    if backend == 'osmesa':
+        from OpenGL import arrays, osmesa
+        context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+        buffer = arrays.GLubyteArray.zeros((height, width, 4))
+        if not context or not osmesa.OSMesaMakeCurrent(context, buffer, GL_UNSIGNED_BYTE, width, height):
+            raise RuntimeError("Could not create an OSMesa context")
+        offscreen = (context, buffer)
+    elif backend == 'egl':
+        from OpenGL import EGL
+        if hasattr(EGL, 'eglGetPlatformDisplayEXT'):
+            display = EGL.eglGetPlatformDisplayEXT(EGL_PLATFORM_SURFACELESS_MESA, EGL.EGL_DEFAULT_DISPLAY, None)
+        else:
+            display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor))
+        
+        attributes = (EGL.EGLint * 9)(EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                                      EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+                                      EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_NONE)
+        config = EGL.EGLConfig()
+        count = EGL.EGLint()
+        EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(count))
+        if not count.value:
+            raise RuntimeError("No EGL config supports desktop OpenGL pbuffers")
+        
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        size = (EGL.EGLint * 5)(EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE)
+        surface = EGL.eglCreatePbufferSurface(display, config, size)
+        context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+        if not EGL.eglMakeCurrent(display, surface, surface, context):
+            raise RuntimeError("Could not make the EGL context current")
+        offscreen = (display, surface, context)
+    else:
+        raise ValueError(f"Unknown offscreen backend: {backend}")
+    
+    # No GLUT window exists - swap in replacements for the GLUT calls the game makes.
+    # Bitmap text needs GLUT's fonts, so the HUD is left out of offscreen frames.
+    namespace = globals()
+    namespace['glutSolidCube'] = solid_cube
+    namespace['glutBitmapCharacter'] = lambda font, character: None
+    namespace['glutSwapBuffers'] = glFlush
+    namespace['glutPostRedisplay'] = lambda: None
+    
+    window_width = width
+    window_height = height
+    glViewport(0, 0, width, height)
+    glEnable(GL_DEPTH_TEST)
+    glClearColor(0.5, 0.7, 1.0, 1.0)  # Sky blue background
+
+# Frame capture - double-buffered PBO readback feeding a pool of writer threads
+CAPTURE_FORMATS = ('png', 'ppm', 'raw')
+capture = None  # Active FrameCapture, if any
+capture_args = None  # FrameCapture settings for live capture, applied once the window exists
+
+def write_png(path, width, height, rows):
+    """Write top-to-bottom RGB rows as a PNG using only zlib"""
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+    
+    scanlines = b''.join(b'\x00' + row for row in rows)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(scanlines, 1)))
+        f.write(chunk(b'IEND', b''))
+
+class FrameCapture:
+    """Reads each frame into one PBO while mapping the previous one, so glReadPixels never stalls"""
+    def __init__(self, output, width, height, fmt='png', workers=2, queue_size=8, policy='block'):
+        if fmt not in CAPTURE_FORMATS:
+            raise ValueError(f"Unknown capture format: {fmt}")
+        self.output = output
+        self.width = width
+        self.height = height
+        self.format = fmt
+        self.policy = policy  # 'block' applies backpressure, 'drop' skips frames when full
+        self.frames = 0
+        self.dropped = 0
+        self.pending = None  # (frame number, PBO index) read last frame, mapped this frame
+        
+        self.pbos = [int(pbo) for pbo in glGenBuffers(2)]
+        self.allocate(width, height)
+        
+        if fmt == 'raw':
+            # One ordered stream (e.g. piped into ffmpeg as rawvideo rgb24) - a single writer
+            workers = 1
+            self.stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        else:
+            os.makedirs(output, exist_ok=True)
+            self.stream = None
+        
+        self.jobs = queue.Queue(queue_size)
+        self.workers = [threading.Thread(target=self.worker_loop, name=f'capture-writer-{i}', daemon=True)
+                        for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+    
+    def allocate(self, width, height):
+        """Size both PBOs for width x height RGB frames"""
+        self.width = width
+        self.height = height
+        self.frame_size = width * height * 3
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.frame_size, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+    
+    def resize(self, width, height):
+        """Follow a new window size - the frame still in flight is collected at its old size first"""
+        if self.format == 'raw':
+            raise ValueError("A raw capture stream cannot change frame size")
+        if self.pending:
+            self.collect(*self.pending)
+            self.pending = None
+        self.allocate(width, height)
+    
+    def grab(self):
+        """Start reading the current frame and hand the previous one to the writers"""
+        index = self.frames % 2
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pbos[index])
+        glReadPixels(0, 0, self.width, self.height, GL_RGB, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        
+        previous = self.pending
+        self.pending = (self.frames, index)
+        self.frames += 1
+        if previous:
+            self.collect(*previous)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+    
+    def collect(self, number, index):
+        """Copy a finished PBO out and queue it for writing"""
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pbos[index])
+        address = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+        pixels = ctypes.string_at(address, self.frame_size)
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        
+        # Each job carries its own size - the window may be resized while it waits
+        job = (number, self.width, self.height, pixels)
+        if self.policy == 'drop':
+            try:
+                self.jobs.put_nowait(job)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            self.jobs.put(job)
+    
+    def worker_loop(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            number, width, height, pixels = job
+            stride = width * 3
+            # GL rows run bottom-up; images run top-down
+            rows = [pixels[y * stride:(y + 1) * stride] for y in range(height - 1, -1, -1)]
+            if self.format == 'raw':
+                self.stream.write(b''.join(rows))
+            elif self.format == 'png':
+                write_png(os.path.join(self.output, f"frame_{number:06d}.png"), width, height, rows)
+            else:
+                with open(os.path.join(self.output, f"frame_{number:06d}.ppm"), 'wb') as f:
+                    f.write(b'P6 %d %d 255\n' % (width, height))
+                    f.write(b''.join(rows))
+    
+    def close(self):
+        """Collect the last frame, drain the queue and stop the writers"""
+        if self.pending:
+            self.collect(*self.pending)
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+            self.pending = None
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join()
+        if self.stream and self.stream is not sys.stdout.buffer:
+            self.stream.close()
+        elif self.stream:
+            self.stream.flush()
+
+def replay_telemetry(session_dir, fps=30):
+    """Yield once per output frame with the game state set from a telemetry session"""
+    global game_state, car_rotation, car_speed, is_off_track, boost_active
+    global current_checkpoint, current_lap, current_time
+    
+    session = TelemetrySession(session_dir)
+    data = session.columns([name for name, _ in TELEMETRY_COLUMNS])
+    times = data['time']
+    if not len(times):
+        return
+    
+    game_state = GAME_STATE_RACING
+    frame = 0
+    index = 0
+    while True:
+        # Show the latest record at or before each frame's timestamp on the session clock,
+        # so restarts and rewinds play through instead of stalling
+        target = times[0] + frame / fps
+        while index + 1 < len(times) and times[index + 1] <= target:
+            index += 1
+        if target > times[-1]:
+            break
+        
+        car_pos[0] = data['x'][index]
+        car_pos[1] = data['y'][index]
+        car_pos[2] = ground_height(car_pos[0], car_pos[1]) + 5
+        car_rotation = data['heading'][index]
+        car_speed = data['speed'][index]
+        is_off_track = bool(data['off_track'][index])
+        boost_active = bool(data['boost'][index])
+        current_checkpoint = data['checkpoint'][index]
+        current_lap = data['lap'][index]
+        current_time = data['race_time'][index]
+        yield frame
+        frame += 1
+
+def run_capture_replay(args):
+    """Render a recorded telemetry session to images or a raw video stream, without a window"""
+    start_offscreen(args.width, args.height, args.offscreen)
+    random.seed(args.seed)
+    init_game()
+    
+    frame_capture = FrameCapture(args.capture, args.width, args.height, args.capture_format,
+                                 args.capture_workers, args.capture_queue, args.capture_policy)
+    started = time.perf_counter()
+    for _ in replay_telemetry(args.replay, args.capture_fps):
+        update_chunks(car_pos[0], car_pos[1])
+        showScreen()
+        frame_capture.grab()
+    frame_capture.close()
+    
+    elapsed = time.perf_counter() - started
+    print(f"Captured {frame_capture.frames} frames ({frame_capture.dropped} dropped) "
+          f"in {elapsed:.1f}s to {args.capture}", file=sys.stderr)
+
+def start_capture(output, fmt='png', workers=2, queue_size=8, policy='drop'):
+    """Record live gameplay frames - called once the window exists"""
+    global capture
+    
+    capture = FrameCapture(output, window_width, window_height, fmt, workers, queue_size, policy)
+    on_close(capture.close)  # Maps the last PBO, so it has to run while the window still exists
+
+# Frame benchmark - scripted scenarios rendered through showScreen() in an offscreen context
+FRAME_BENCH_SCENARIOS = ('start', 'third_person', 'first_person', 'finish')
+FRAME_BENCH_WARMUP = 10       # Frames dropped while display lists compile
+FRAME_BENCH_COUNT_FRAMES = 10  # Frames rendered again with every GL call counted
+FRAME_BENCH_LAP_STEP = 1.5    # Degrees around the circuit per frame
+
+def bench_pose(scenario, frame):
+    """Put the game in the scenario's state, with the cars this far along their scripted lap"""
+    global game_state, camera_mode, car_rotation, car_speed, best_lap_time
+    
+    if scenario == 'start':
+        game_state = GAME_STATE_START
+    elif scenario == 'finish':
+        game_state = GAME_STATE_FINISHED
+        lap_times[:] = [21.5, 20.25, 19.75]  # In place - split-screen state holds this list
+        best_lap_time = min(lap_times)
+    else:
+        game_state = GAME_STATE_RACING
+    
+    # Lap the middle of the track so the camera keeps turning - split-screen cars spread out
+    for i, player in enumerate(players or [None]):
+        if player:
+            activate_player(player)
+        if game_state == GAME_STATE_RACING:
+            camera_mode = CAMERA_FIRST_PERSON if scenario == 'first_person' else CAMERA_THIRD_PERSON
+        heading = frame * FRAME_BENCH_LAP_STEP + i * 20
+        angle = heading * math.pi / 180
+        car_pos[0] = math.cos(angle) * 800
+        car_pos[1] = math.sin(angle) * 800
+        car_pos[2] = ground_height(car_pos[0], car_pos[1]) + 5
+        car_rotation = heading + 90
+        car_speed = 250  # Fast enough for speed lines
+    if players:
+        activate_player(players[0])
+
+def load_bench_chunks():
+    """Make every chunk the coming frame draws resident, so no frame shows loading tiles"""
+    points = [(x, y) for x, y, _, _ in minimap_markers()] if game_state == GAME_STATE_RACING else [(0, 0)]
+    for x, y in points:
+        fcx, fcy = chunk_coords(x, y)
+        for cx in range(fcx - CHUNK_VIEW_RADIUS, fcx + CHUNK_VIEW_RADIUS + 1):
+            for cy in range(fcy - CHUNK_VIEW_RADIUS, fcy + CHUNK_VIEW_RADIUS + 1):
+                get_chunk(cx, cy)
+
+def count_gl_calls(render):
+    """Run render() with every gl*/glu*/glut* global wrapped, returning calls per function"""
+    namespace = globals()
+    counts = collections.Counter()
+    originals = {name: value for name, value in namespace.items()
+                 if name.startswith('gl') and callable(value)}
+    
+    def counted(name, function):
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return function(*args, **kwargs)
+        return wrapper
+    
+    namespace.update({name: counted(name, function) for name, function in originals.items()})
+    try:
+        render()
+    finally:
+        namespace.update(originals)
+    return counts
+
+def bench_frames(args):
+    """Time scripted scenarios offscreen and report frame-time percentiles and GL call counts"""
+    global render_scale
+    
+    start_offscreen(args.width, args.height, args.offscreen)
+    random.seed(args.seed)
+    init_game()
+    if args.players > 1:
+        start_players(args.players)
+    render_scale = min(1.0, max(RENDER_SCALE_MIN, args.render_scale))
+    
+    def render(scenario, frames):
+        times = []
+        for frame in range(frames):
+            bench_pose(scenario, frame)
+            load_bench_chunks()
+            started = time.perf_counter()
+            showScreen()
+            glFinish()
+            times.append(time.perf_counter() - started)
+        return times
+    
+    report = {}
+    print(f"{'scenario':<14}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean ms':>9}"
+          f"{'GL calls':>10}{'queued':>8}{'colours':>9}")
+    for scenario in args.scenarios:
+        times = render(scenario, args.bench_frames + FRAME_BENCH_WARMUP)[FRAME_BENCH_WARMUP:]
+        
+        submitted, colour_changes = render_queue.submitted, render_queue.colour_changes
+        counts = count_gl_calls(lambda: render(scenario, FRAME_BENCH_COUNT_FRAMES))
+        gl_calls = sum(counts.values()) / FRAME_BENCH_COUNT_FRAMES
+        queued = (render_queue.submitted - submitted) / FRAME_BENCH_COUNT_FRAMES
+        colours = (render_queue.colour_changes - colour_changes) / FRAME_BENCH_COUNT_FRAMES
+        
+        result = {'p50': percentile(times, 0.5), 'p95': percentile(times, 0.95),
+                  'p99': percentile(times, 0.99), 'mean': statistics.fmean(times)}
+        print(f"{scenario:<14}" + "".join(f"{result[key] * 1000:9.2f}" for key in ('p50', 'p95', 'p99', 'mean')) +
+              f"{gl_calls:10.0f}{queued:8.0f}{colours:9.0f}")
+        if args.verbose:
+            for name, count in counts.most_common(8):
+                print(f"    {name:<24}{count / FRAME_BENCH_COUNT_FRAMES:10.0f}")
+        report[f"{scenario} p50"] = result['p50']
+        report[f"{scenario} gl_calls"] = gl_calls
+    
+    return check_baseline(report, args)
+
+def bench_sky(args):
+    """Time the scenarios with sky impostors against drawing the sun and clouds every frame"""
+    global render_scale, sky_cache, sky_bakes, sun_angle, draw_sky
+    
+    start_offscreen(args.width, args.height, args.offscreen)
+    random.seed(args.seed)
+    init_game()
+    if args.players > 1:
+        start_players(args.players)
+    render_scale = min(1.0, max(RENDER_SCALE_MIN, args.render_scale))
+    sky_start = (clouds.to_bytes(), sun_angle)
+    
+    # Time the sky on its own too - the rest of the frame is identical in both passes
+    sky_times = []
+    untimed_sky = draw_sky
+    def timed_sky():
+        glFinish()
+        started = time.perf_counter()
+        untimed_sky()
+        glFinish()
+        sky_times.append(time.perf_counter() - started)
+    draw_sky = timed_sky
+    
+    print(f"{'scenario':<14}{'sky':<11}{'frame p50':>10}{'p99':>8}{'mean':>8}"
+          f"{'sky p50':>10}{'p99':>8}{'mean':>8}{'bakes':>7}")
+    try:
+        for scenario in args.scenarios:
+            for cached in (False, True):
+                # Both passes see the same clouds, from fresh impostors
+                sky_cache = cached
+                clouds.load_bytes(sky_start[0])
+                sun_angle = sky_start[1]
+                sky_layers.clear()
+                sky_bakes = 0
+                frame_times = []
+                sky_times.clear()
+                for frame in range(args.bench_frames + FRAME_BENCH_WARMUP):
+                    bench_pose(scenario, frame)
+                    load_bench_chunks()
+                    started = time.perf_counter()
+                    showScreen()
+                    glFinish()
+                    frame_times.append(time.perf_counter() - started)
+                
+                # Split-screen frames draw the sky once per view
+                frame_times = frame_times[FRAME_BENCH_WARMUP:]
+                sky_times[:FRAME_BENCH_WARMUP * max(1, len(players))] = []
+                row = f"{scenario:<14}{'impostors' if cached else 'per-frame':<11}"
+                for times in (frame_times, sky_times):
+                    row += (f"{percentile(times, 0.5) * 1000:10.2f}{percentile(times, 0.99) * 1000:8.2f}"
+                            f"{statistics.fmean(times) * 1000:8.2f}")
+                print(row + f"{sky_bakes if cached else '-':>7}")
+    finally:
+        draw_sky = untimed_sky
+    return 0
+
+# Allocation profiling - per-frame allocations and GC pauses, attributed per function
+ALLOC_PROFILED_PREFIXES = ('draw_', 'check_')
+ALLOC_PROFILED_EXTRA = ('setupCamera', 'update_car_physics')
+ALLOC_WARMUP_FRAMES = 30  # Caches fill during the first frames - budgets apply after these
+
+alloc_profiler = None  # Active AllocationProfiler, if any
+
+class AllocScope:
+    """Allocation counters for one call (or one frame) while it runs"""
+    __slots__ = ('start', 'peak', 'blocks')
+    
+    def __init__(self):
+        self.start = tracemalloc.get_traced_memory()[0]
+        self.peak = self.start
+        self.blocks = sys.getallocatedblocks()
+
+class AllocationProfiler:
+    """Wraps the draw_*/check_* functions and tracks their allocations frame by frame"""
+    def __init__(self, budgets=None):
+        self.budgets = budgets or {}   # 'frame' or function name -> bytes allowed per frame
+        self.stack = []
+        self.frame_usage = {}          # name -> [calls, bytes, net blocks] this frame
+        self.totals = {}               # name -> [calls, bytes sum, bytes max, net blocks sum]
+        self.frame_bytes = []
+        self.frame_gc = []             # GC pause seconds per frame
+        self.gc_pause = 0.0
+        self.gc_started = None
+        self.violations = []           # (frame, name, bytes, budget)
+        self.frames = 0
+        
+        tracemalloc.start()
+        gc.callbacks.append(self.on_gc)
+        self.frame_scope = self.enter()
+    
+    def enter(self):
+        if self.stack:
+            # Fold the parent's peak so far in before the child resets it
+            parent = self.stack[-1]
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        scope = AllocScope()
+        self.stack.append(scope)
+        return scope
+    
+    def exit(self):
+        """Close the innermost scope and return (bytes allocated at peak, net blocks)"""
+        scope = self.stack.pop()
+        scope.peak = max(scope.peak, tracemalloc.get_traced_memory()[1])
+        if self.stack:
+            self.stack[-1].peak = max(self.stack[-1].peak, scope.peak)
+        return scope.peak - scope.start, sys.getallocatedblocks() - scope.blocks
+    
+    def wrap(self, name, func):
+        """Instrumented version of func that charges its allocations to name"""
+        def profiled(*args, **kwargs):
+            self.enter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                allocated, blocks = self.exit()
+                usage = self.frame_usage.setdefault(name, [0, 0, 0])
+                usage[0] += 1
+                usage[1] += allocated
+                usage[2] += blocks
+        profiled.__name__ = func.__name__
+        profiled.__doc__ = func.__doc__
+        profiled.__wrapped__ = func
+        return profiled
+    
+    def on_gc(self, phase, info):
+        if phase == 'start':
+            self.gc_started = time.perf_counter()
+        elif self.gc_started is not None:
+            self.gc_pause += time.perf_counter() - self.gc_started
+            self.gc_started = None
+    
+    def end_frame(self):
+        """Close the current frame, check budgets and start the next frame"""
+        frame_bytes, _ = self.exit()
+        self.frames += 1
+        self.frame_bytes.append(frame_bytes)
+        self.frame_gc.append(self.gc_pause)
+        self.gc_pause = 0.0
+        
+        for name, (calls, allocated, blocks) in self.frame_usage.items():
+            totals = self.totals.setdefault(name, [0, 0, 0, 0])
+            totals[0] += calls
+            totals[1] += allocated
+            totals[2] = max(totals[2], allocated)
+            totals[3] += blocks
+        
+        if self.frames > ALLOC_WARMUP_FRAMES:
+            usage = dict((name, values[1]) for name, values in self.frame_usage.items())
+            usage['frame'] = frame_bytes
+            for name, budget in self.budgets.items():
+                if usage.get(name, 0) > budget:
+                    self.violations.append((self.frames, name, usage[name], budget))
+        
+        self.frame_usage = {}
+        self.frame_scope = self.enter()
+    
+    def report(self, out=sys.stdout):
+        """Print per-function allocation and GC pause statistics"""
+        frames = max(1, self.frames)
+        print(f"Allocation profile over {self.frames} frames", file=out)
+        print(f"{'function':<28} {'calls/f':>8} {'mean B/f':>10} {'max B/f':>10} {'blocks/f':>9}", file=out)
+        for name, (calls, allocated, worst, blocks) in sorted(self.totals.items(), key=lambda item: -item[1][1]):
+            print(f"{name:<28} {calls / frames:8.2f} {allocated / frames:10.0f} {worst:10d} {blocks / frames:9.2f}",
+                  file=out)
+        if self.frame_bytes:
+            print(f"frame bytes: p50 {percentile(self.frame_bytes, 0.5)}  p99 {percentile(self.frame_bytes, 0.99)}  "
+                  f"max {max(self.frame_bytes)}", file=out)
+        pauses = [pause for pause in self.frame_gc if pause]
+        print(f"GC pauses: {len(pauses)} frames with collections, "
+              f"max {max(pauses, default=0) * 1000:.2f} ms, total {sum(pauses) * 1000:.2f} ms", file=out)
+        for frame, name, allocated, budget in self.violations[:20]:
+            print(f"BUDGET EXCEEDED frame {frame}: {name} allocated {allocated} B (budget {budget} B)", file=out)
+        if len(self.violations) > 20:
+            print(f"... {len(self.violations) - 20} more budget violations", file=out)
+    
+    def stop(self):
+        gc.callbacks.remove(self.on_gc)
+        tracemalloc.stop()
+
+def start_alloc_profiler(budget_path=None):
+    """Instrument the draw_*/check_* functions (and a few other hot paths)"""
+    global alloc_profiler
+    
+    budgets = None
+    if budget_path:
+        with open(budget_path) as f:
+            budgets = json.load(f)
+    alloc_profiler = AllocationProfiler(budgets)
+    
+    namespace = globals()
+    for name, value in list(namespace.items()):
+        if callable(value) and not isinstance(value, type) and \
+                (name.startswith(ALLOC_PROFILED_PREFIXES) or name in ALLOC_PROFILED_EXTRA):
+            namespace[name] = alloc_profiler.wrap(name, value)
+    return alloc_profiler
+
+# Headless simulation - runs the game physics without a window
+SIM_TICK = 1 / 60  # Simulated seconds per physics tick (game assumes ~60 FPS)
+TUNABLE_PARAMS = ('car_acceleration', 'car_deceleration', 'car_turn_speed',
+                  'car_friction', 'boost_speed_multiplier', 'off_track_penalty')
+
+class SimClock:
+    """Tick-driven clock used in place of time.time() by headless runs"""
+    def __init__(self, dt=SIM_TICK):
+        self.now = 0.0
+        self.dt = dt
+
+    def tick(self):
+        self.now += self.dt
+
+    def __call__(self):
+        return self.now
+
+def wrap_angle(angle):
+    """Wrap an angle in radians to (-pi, pi]"""
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+def ai_driver(tick):
+    """Pure-pursuit driver that chases a point ahead on the track centerline"""
+    track_angle = math.atan2(car_pos[1], car_pos[0])
+    target_angle = track_angle + 0.35  # Look ahead ~20 degrees along the circle
+    target_x = math.cos(target_angle) * 800
+    target_y = math.sin(target_angle) * 800
+    
+    desired = math.atan2(target_y - car_pos[1], target_x - car_pos[0])
+    error = wrap_angle(desired - car_rotation * math.pi / 180)
+    
+    keys_pressed[b'a'] = error > 0.03
+    keys_pressed[b'd'] = error < -0.03
+    # Lift off when the car is pointing well away from the racing line
+    keys_pressed[b'w'] = abs(error) < 0.5 or car_speed < 150
+    keys_pressed[b's'] = False
+
+# Look-ahead driver - tries each action on a cloned state and keeps the one that gets furthest
+LOOKAHEAD_ACTIONS = (   # (throttle, steer left, steer right)
+    (True, False, False), (True, True, False), (True, False, True),
+    (False, False, False), (False, True, False), (False, False, True),
+)
+LOOKAHEAD_TICKS = 30         # How far ahead each action is simulated
+LOOKAHEAD_INTERVAL = 5       # Ticks between searches - the chosen action is held in between
+LOOKAHEAD_LINE_WEIGHT = 1.0  # Progress (radians around the circuit) lost per 800 units off the centerline
+
+def make_lookahead_driver(horizon=LOOKAHEAD_TICKS, interval=LOOKAHEAD_INTERVAL):
+    """Build a driver that searches ahead with snapshot clone/restore cycles (headless only)"""
+    state = {'action': LOOKAHEAD_ACTIONS[0]}
+    
+    def apply(action):
+        keys_pressed[b'w'], keys_pressed[b'a'], keys_pressed[b'd'] = action
+        keys_pressed[b's'] = False
+    
+    def driver(tick):
+        if tick % interval == 0:
+            start = capture_state()
+            start_time = clock.now
+            best_score = None
+            for action in LOOKAHEAD_ACTIONS:
+                apply(action)
+                angle = math.atan2(car_pos[1], car_pos[0])
+                progress = 0.0
+                for _ in range(horizon):
+                    if game_state != GAME_STATE_RACING:
+                        break
+                    step_simulation()
+                    new_angle = math.atan2(car_pos[1], car_pos[0])
+                    progress += wrap_angle(new_angle - angle)
+                    angle = new_angle
+                # Checkpoints sit on the centerline, so drifting wide is not real progress
+                progress -= LOOKAHEAD_LINE_WEIGHT * abs(math.hypot(car_pos[0], car_pos[1]) - 800) / 800
+                
+                # Wind the clock back first - restore_state() rebuilds times relative to it
+                clock.now = start_time
+                restore_state(start)
+                if best_score is None or progress > best_score:
+                    best_score = progress
+                    state['action'] = action
+        apply(state['action'])
+    return driver
+
+def make_scripted_driver(script):
+    """Build a driver that replays [tick, key, pressed] events from a script"""
+    events = sorted((int(t), k.encode(), bool(down)) for t, k, down in script)
+    state = {'next': 0}
+    
+    def driver(tick):
+        while state['next'] < len(events) and events[state['next']][0] <= tick:
+            _, key, down = events[state['next']]
+            if key in keys_pressed:
+                keys_pressed[key] = down
+            state['next'] += 1
+    return driver
+
+def apply_params(params):
+    """Set car tuning globals from a {name: value} dict"""
+    global car_config
+    
+    namespace = globals()
+    for name, value in params.items():
+        if name not in TUNABLE_PARAMS:
+            raise ValueError(f"Unknown tuning parameter: {name}")
+        if namespace[name] != value:
+            namespace[name] = value
+            car_config = None  # Hashed again on next use
+
+def step_simulation():
+    """Advance the race by one tick of the simulation clock"""
+    global current_time
+    
+    clock.tick()
+    current_time = clock() - race_start_time
+    update_car()
+
+def run_headless_race(params=None, driver='ai', seed=0, laps=3, max_time=300, script=None):
+    """Simulate one race without rendering and return its results"""
+    global clock, game_state, total_laps
+    
+    random.seed(seed)
+    apply_params(params or {})
+    init_game()  # Also resets the race state
+    
+    sim_clock = SimClock()
+    clock = sim_clock
+    game_state = GAME_STATE_RACING
+    total_laps = laps
+    
+    if driver == 'ai':
+        drive = ai_driver
+    elif driver == 'lookahead':
+        drive = make_lookahead_driver()
+    elif driver == 'scripted':
+        drive = make_scripted_driver(script or [])
+    else:
+        raise ValueError(f"Unknown driver: {driver}")
+    
+    # A miss is counted when the car sweeps past the pending checkpoint's angle
+    # around the circuit without having triggered it
+    checkpoint_misses = 0
+    passed_count = 0
+    prev_checkpoint = current_checkpoint
+    prev_offset = None
+    max_ticks = int(max_time / SIM_TICK)
+    tick = 0
+    
+    while game_state == GAME_STATE_RACING and tick < max_ticks:
+        drive(tick)
+        step_simulation()
+        update_progress()  # Not inside step_simulation() - the look-ahead driver steps too
+        if telemetry:
+            record_telemetry(SIM_TICK)
+        if alloc_profiler:
+            alloc_profiler.end_frame()
+        tick += 1
+        
+        if current_checkpoint != prev_checkpoint or game_state != GAME_STATE_RACING:
+            passed_count += 1
+            prev_checkpoint = current_checkpoint
+            prev_offset = None
+            continue
+        
+        checkpoint_angle = math.atan2(checkpoints.y[current_checkpoint], checkpoints.x[current_checkpoint])
+        offset = wrap_angle(math.atan2(car_pos[1], car_pos[0]) - checkpoint_angle)
+        if prev_offset is not None and prev_offset < 0 <= offset and offset - prev_offset < math.pi:
+            checkpoint_misses += 1
+        prev_offset = offset
+    
+    clock = time.time
+    return {
+        'lap_times': list(lap_times),
+        'finished': game_state == GAME_STATE_FINISHED,
+        'checkpoints_passed': passed_count,
+        'checkpoint_misses': checkpoint_misses,
+        'sim_time': sim_clock.now,
+        'splits': list(race_progress.cars[0].splits) if race_progress.cars else [],
+    }
+
+# Parameter sweeps - fan headless races out over all cores
+SWEEP_CACHE_VERSION = 2  # 2: key includes the --script events
+
+def parse_sweep_spec(spec):
+    """Parse 'name=v1,v2,...' or 'name=start:stop:count' into (name, values)"""
+    name, _, values = spec.partition('=')
+    name = name.strip()
+    if name not in TUNABLE_PARAMS:
+        raise ValueError(f"Unknown tuning parameter: {name}")
+    if ':' in values:
+        start, stop, count = values.split(':')
+        start, stop, count = float(start), float(stop), int(count)
+        if count < 2:
+            return name, [start]
+        step = (stop - start) / (count - 1)
+        return name, [start + i * step for i in range(count)]
+    return name, [float(v) for v in values.split(',') if v]
+
+def sweep_points(grid, search='grid', samples=20, rng=None):
+    """Yield parameter dicts for a grid or random search over the grid bounds"""
+    names = list(grid)
+    if search == 'grid':
+        for combo in itertools.product(*(grid[n] for n in names)):
+            yield dict(zip(names, combo))
+    elif search == 'random':
+        rng = rng or random.Random(0)
+        for _ in range(samples):
+            yield {n: rng.uniform(min(grid[n]), max(grid[n])) for n in names}
+    else:
+        raise ValueError(f"Unknown search mode: {search}")
+
+def refine_points(grid, ranked, samples, rng):
+    """Sample new points around the best results so far, within the grid bounds"""
+    points = []
+    elite = ranked[:max(1, len(ranked) // 4)]
+    for i in range(samples):
+        centre = elite[i % len(elite)]['params']
+        point = {}
+        for name, values in grid.items():
+            low, high = min(values), max(values)
+            spread = (high - low) * 0.15
+            point[name] = min(high, max(low, rng.gauss(centre[name], spread)))
+        points.append(point)
+    return points
+
+def script_hash(script):
+    """Hash of a driver script's events, in the order make_scripted_driver() replays them"""
+    events = sorted((int(t), k, bool(down)) for t, k, down in script or [])
+    return hashlib.sha1(json.dumps(events).encode()).hexdigest()
+
+def sweep_key(params, driver, runs, laps, max_time, script=None):
+    """Stable hash identifying one sweep point's configuration"""
+    blob = json.dumps({
+        'version': SWEEP_CACHE_VERSION,
+        'params': {k: round(v, 9) for k, v in sorted(params.items())},
+        'driver': driver, 'runs': runs, 'laps': laps, 'max_time': max_time,
+        'script': script_hash(script) if driver == 'scripted' else None,
+    }, sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+def evaluate_point(job):
+    """Worker entry point - run every seed for one parameter set"""
+    params, driver, runs, laps, max_time, script = job
+    results = [run_headless_race(params, driver, seed, laps, max_time, script)
+               for seed in range(runs)]
+    
+    laps_done = [t for r in results for t in r['lap_times']]
+    passed = sum(r['checkpoints_passed'] for r in results)
+    misses = sum(r['checkpoint_misses'] for r in results)
+    return {
+        'params': params,
+        'finished': sum(r['finished'] for r in results),
+        'runs': runs,
+        'lap_times': laps_done,
+        'race_times': [sum(r['lap_times']) for r in results if r['finished']],
+        'miss_rate': misses / (misses + passed) if misses + passed else 0.0,
+    }
+
+def load_sweep_cache(path):
+    """Read completed sweep points from a JSON-lines cache file"""
+    cache = {}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    cache[entry['key']] = entry['result']
+    return cache
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def print_sweep_report(results):
+    """Print lap-time distribution and miss rate per configuration, best first"""
+    def rank(result):
+        laps = result['lap_times']
+        return statistics.median(laps) if laps else float('inf')
+    
+    print(f"{'params':<60} {'fin':>5} {'min':>7} {'p50':>7} {'p90':>7} {'max':>7} {'miss%':>6}")
+    for result in sorted(results, key=rank):
+        params = ' '.join(f"{k}={v:.4g}" for k, v in sorted(result['params'].items()))
+        laps = result['lap_times']
+        fin = f"{result['finished']}/{result['runs']}"
+        if laps:
+            stats = (min(laps), percentile(laps, 0.5), percentile(laps, 0.9), max(laps))
+            cols = ' '.join(f"{v:7.2f}" for v in stats)
+        else:
+            cols = ' '.join(f"{'-':>7}" for _ in range(4))
+        print(f"{params:<60} {fin:>5} {cols} {result['miss_rate'] * 100:6.1f}")
+
+def run_sweep(args):
+    """Run a parameter sweep over all cores, skipping points already cached"""
+    grid = dict(parse_sweep_spec(spec) for spec in args.sweep)
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    
+    rng = random.Random(args.sweep_seed)
+    cache = load_sweep_cache(args.cache)
+    cache_file = open(args.cache, 'a') if args.cache else None
+    results = []
+    
+    def evaluate(points):
+        jobs = []
+        for params in points:
+            key = sweep_key(params, args.driver, args.runs, args.laps, args.max_time, script)
+            if key in cache:
+                results.append(cache[key])
+            else:
+                jobs.append((key, (params, args.driver, args.runs, args.laps, args.max_time, script)))
+        if not jobs:
+            return
+        
+        print(f"Simulating {len(jobs)} configurations x {args.runs} runs "
+              f"({len(results)} cached) on {args.workers} workers")
+        with multiprocessing.Pool(args.workers) as pool:
+            for (key, _), result in zip(jobs, pool.imap(evaluate_point, [job for _, job in jobs])):
+                cache[key] = result
+                results.append(result)
+                if cache_file:
+                    cache_file.write(json.dumps({'key': key, 'result': result}) + '\n')
+                    cache_file.flush()
+    
+    try:
+        if args.search == 'adaptive':
+            # Random exploration first, then repeatedly refine around the best points
+            rounds = 3
+            per_round = max(1, args.samples // (rounds + 1))
+            evaluate(list(sweep_points(grid, 'random', per_round, rng)))
+            for _ in range(rounds):
+                ranked = sorted(results, key=lambda r: statistics.median(r['lap_times']) if r['lap_times'] else float('inf'))
+                evaluate(refine_points(grid, ranked, per_round, rng))
+        else:
+            evaluate(list(sweep_points(grid, args.search, args.samples, rng)))
+    finally:
+        if cache_file:
+            cache_file.close()
+    
+    print_sweep_report(results)
+    return results
+
+def run_headless(args):
+    """Simulate a single race without a window and print its results"""
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    
+    started = time.perf_counter()
+    result = run_headless_race(driver=args.driver, seed=args.seed, laps=args.laps,
+                               max_time=args.max_time, script=script)
+    elapsed = time.perf_counter() - started
+    
+    for i, lap_time in enumerate(result['lap_times']):
+        print(f"Lap {i + 1}: {lap_time:.2f}s")
+    status = "Finished" if result['finished'] else "Did not finish"
+    print(f"{status} - {result['sim_time']:.2f}s simulated in {elapsed:.3f}s, "
+          f"{result['checkpoint_misses']} checkpoint misses")
+    return result
+
+# Startup benchmark - import and init_game() latency measured in fresh interpreters
+STARTUP_PROBE = """
+import importlib.util, json, sys, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location('racing_game', sys.argv[1])
+game = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(game)
+imported = time.perf_counter()
+game.init_game()
+initialised = time.perf_counter()
+print(json.dumps({'import': imported - started, 'init_game': initialised - imported,
+                  'opengl_imported': 'OpenGL' in sys.modules}))
+"""
+
+def bench_startup(args):
+    """Measure startup latency and compare it with a saved baseline"""
+    samples = []
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, '-c', STARTUP_PROBE, os.path.abspath(__file__)],
+                                check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output))
+    
+    if any(sample['opengl_imported'] for sample in samples):
+        print("FAIL: importing the game pulled in OpenGL")
+        return 1
+    
+    report = {name: statistics.median(sample[name] for sample in samples)
+              for name in ('import', 'init_game')}
+    for name, seconds in report.items():
+        print(f"{name:<10} {seconds * 1000:8.2f} ms (median of {args.repeat})")
+    return check_baseline(report, args)
+
+def check_baseline(report, args):
+    """Compare a {name: value} report with the --baseline file, saving it if asked to or missing.
+    Names ending in 'gl_calls' are counts, the rest are seconds."""
+    if not args.baseline:
+        return 0
+    if args.save_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    status = 0
+    for name, value in report.items():
+        if name not in baseline:
+            continue  # Scenario added since the baseline was saved
+        limit = baseline[name] * (1 + args.tolerance)
+        if value <= limit:
+            continue
+        if name.endswith('gl_calls'):
+            print(f"REGRESSION: {name} is {value:.0f}, baseline {baseline[name]:.0f} (limit {limit:.0f})")
+        else:
+            print(f"REGRESSION: {name} took {value * 1000:.2f} ms, "
+                  f"baseline {baseline[name] * 1000:.2f} ms (limit {limit * 1000:.2f} ms)")
+        status = 1
+    return status
 
 def main():
+    load_gl()
     glutInit()
     glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
-    glutInitWindowSize(1000, 800)
+    glutInitWindowSize(window_width, window_height)
     glutInitWindowPosition(0, 0)
     glutCreateWindow(b"3D Racing Circuit Game")
     
@@ -1097,15 +4320,145 @@ def main():
     glClearColor(0.5, 0.7, 1.0, 1.0)  # Sky blue background
     
     init_game()
+    if player_count > 1:
+        start_players(player_count)
+    if capture_args:
+        start_capture(*capture_args)
     
     glutDisplayFunc(showScreen)
+    glutReshapeFunc(reshape)
     glutKeyboardFunc(keyboardListener)
     glutKeyboardUpFunc(keyboardUpListener)  # Important for continuous movement
     glutSpecialFunc(specialKeyListener)
     glutMouseFunc(mouseListener)
     glutIdleFunc(idle)
     
+    # Closing the window returns from the main loop instead of exiting, so nothing queued is lost.
+    # The hooks run from the close callback, while the window's GL context is still current.
+    glutCloseFunc(run_close_hooks)
+    glutSetOption(GLUT_ACTION_ON_WINDOW_CLOSE, GLUT_ACTION_GLUTMAINLOOP_RETURNS)
     glutMainLoop()
+    run_close_hooks()
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="3D Racing Circuit Game")
+    sweep = parser.add_argument_group('parameter sweep (headless)')
+    sweep.add_argument('--sweep', nargs='+', metavar='PARAM=VALUES',
+                       help="tune parameters, e.g. car_acceleration=1,2,3 car_friction=0.95:0.99:5")
+    sweep.add_argument('--search', choices=('grid', 'random', 'adaptive'), default='grid',
+                       help="grid of all values, or random/adaptive sampling within their bounds")
+    sweep.add_argument('--samples', type=int, default=20, help="points to try for random/adaptive search")
+    sweep.add_argument('--sweep-seed', type=int, default=0, help="seed for random/adaptive sampling")
+    sweep.add_argument('--driver', choices=('ai', 'lookahead', 'scripted'), default='ai', help="who drives the simulated car")
+    sweep.add_argument('--script', help="JSON list of [tick, key, pressed] events for the scripted driver")
+    sweep.add_argument('--runs', type=int, default=5, help="races (seeds) per configuration")
+    sweep.add_argument('--laps', type=int, default=total_laps, help="laps per simulated race")
+    sweep.add_argument('--max-time', type=float, default=300, help="simulated seconds before a race is abandoned")
+    sweep.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="parallel simulation processes")
+    sweep.add_argument('--cache', default='sweep_cache.jsonl', help="results cache, keyed by parameter hash")
+    parser.add_argument('--telemetry', metavar='DIR',
+                        help="record per-tick car telemetry to a new session under DIR")
+    parser.add_argument('--player', default=player_name, help="name recorded on the leaderboard")
+    parser.add_argument('--leaderboard', default=LEADERBOARD_PATH, help="SQLite leaderboard file")
+    parser.add_argument('--no-leaderboard', action='store_true', help="don't record laps and races")
+    parser.add_argument('--input-latency', metavar='FILE',
+                        help="write an input-to-present latency histogram (JSON) to FILE on exit")
+    parser.add_argument('--build-label', default='dev', help="build name stored with the latency histogram")
+    cap = parser.add_argument_group('frame capture')
+    cap.add_argument('--capture', metavar='OUT',
+                     help="record frames to directory OUT (png/ppm) or file OUT ('-' = stdout) for raw")
+    cap.add_argument('--capture-format', choices=CAPTURE_FORMATS, default='png')
+    cap.add_argument('--capture-workers', type=int, default=2, help="threads encoding and writing frames")
+    cap.add_argument('--capture-queue', type=int, default=8, help="frames waiting for a writer before the policy applies")
+    cap.add_argument('--capture-policy', choices=('block', 'drop'), default=None,
+                     help="when writers fall behind, stall rendering or drop frames (default: drop live, block replays)")
+    cap.add_argument('--replay', metavar='SESSION', help="render a recorded telemetry session instead of playing")
+    cap.add_argument('--capture-fps', type=float, default=30, help="output frame rate for replays")
+    cap.add_argument('--offscreen', choices=('egl', 'osmesa'), default='egl',
+                     help="windowless GL backend used for replays")
+    cap.add_argument('--width', type=int, default=window_width, help="replay frame width")
+    cap.add_argument('--height', type=int, default=window_height, help="replay frame height")
+    alloc = parser.add_argument_group('allocation profiling')
+    alloc.add_argument('--alloc-profile', action='store_true',
+                       help="report allocations and GC pauses per frame for each draw_*/check_* function")
+    alloc.add_argument('--alloc-budget', metavar='FILE',
+                       help="JSON {'frame' or function: bytes per frame}; exceeding it fails a --headless run")
+    parser.add_argument('--headless', action='store_true',
+                        help="simulate one race with --driver and print lap times, without OpenGL")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for --headless")
+    parser.add_argument('--rewind', type=float, default=REWIND_SECONDS, metavar='SECONDS',
+                        help="seconds of race history kept for rewinding with B (0 turns rewinding off)")
+    parser.add_argument('--players', type=int, default=1, choices=range(1, MAX_PLAYERS + 1), metavar='N',
+                        help="split the screen between N local players (1-4)")
+    parser.add_argument('--render-scale', type=float, default=1.0,
+                        help="draw the 3D scene at this fraction of the window resolution")
+    parser.add_argument('--target-fps', type=float, default=0,
+                        help="adjust the render scale automatically to hold this frame rate")
+    parser.add_argument('--no-sky-cache', action='store_true',
+                        help="draw the sun and clouds every frame instead of from impostors")
+    bench = parser.add_argument_group('startup benchmark')
+    bench.add_argument('--bench-startup', action='store_true',
+                       help="time module import and init_game() in fresh interpreters")
+    bench.add_argument('--repeat', type=int, default=5, help="samples per measurement")
+    bench.add_argument('--bench-render', action='store_true',
+                       help="render scripted scenarios offscreen and report frame times and GL calls "
+                            "(uses --offscreen, --width, --height, --players, --render-scale)")
+    bench.add_argument('--bench-sky', action='store_true',
+                       help="run the --bench-render scenarios with sky impostors and with the sky drawn every frame")
+    bench.add_argument('--scenarios', nargs='+', choices=FRAME_BENCH_SCENARIOS, default=list(FRAME_BENCH_SCENARIOS),
+                       help="--bench-render and --bench-sky scenarios to run")
+    bench.add_argument('--verbose', action='store_true', help="list the most called GL functions per scenario")
+    bench.add_argument('--bench-frames', type=int, default=300,
+                       help="frames rendered per --bench-render scenario or --bench-sky pass")
+    bench.add_argument('--baseline', help="JSON baseline to compare against (created if missing)")
+    bench.add_argument('--save-baseline', action='store_true', help="overwrite the baseline with this run")
+    bench.add_argument('--tolerance', type=float, default=0.25,
+                       help="allowed slowdown over the baseline before failing (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+    if args.telemetry and args.sweep:
+        # The recorder's writer thread lives in this process - pool workers would lose their rows
+        parser.error("--telemetry cannot be combined with --sweep; record single races with --headless")
+    return args
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.telemetry:
+        # Status goes to stderr - stdout may be a raw capture stream
+        print(f"Recording telemetry to {start_telemetry(args.telemetry)}", file=sys.stderr)
+    if args.alloc_profile or args.alloc_budget:
+        start_alloc_profiler(args.alloc_budget)
+        on_close(alloc_profiler.report)
+    if args.bench_startup:
+        sys.exit(bench_startup(args))
+    elif args.bench_render:
+        sys.exit(bench_frames(args))
+    elif args.bench_sky:
+        sys.exit(bench_sky(args))
+    elif args.sweep:
+        run_sweep(args)
+    elif args.headless:
+        run_headless(args)
+        if alloc_profiler and alloc_profiler.violations:
+            sys.exit(1)  # The report from the close hook lists the violations
+    elif args.replay:
+        if not args.capture:
+            sys.exit("--replay needs --capture OUT")
+        args.capture_policy = args.capture_policy or 'block'
+        run_capture_replay(args)
+    else:
+        render_scale = min(1.0, max(RENDER_SCALE_MIN, args.render_scale))
+        target_fps = args.target_fps
+        sky_cache = not args.no_sky_cache
+        player_count = args.players
+        if args.rewind > 0 and player_count == 1:
+            rewind_buffer = RewindBuffer(args.rewind)  # One race history only
+        player_name = args.player
+        if args.input_latency:
+            start_input_latency(args.build_label, args.input_latency)
+        if args.capture:
+            capture_args = (args.capture, args.capture_format, args.capture_workers,
+                            args.capture_queue, args.capture_policy or 'drop')
+        if not args.no_leaderboard:
+            start_leaderboard(args.leaderboard)
+        main()
\ No newline at end of file
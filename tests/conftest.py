@@ -0,0 +1,17 @@
+"""Shared fixtures - the game script is loaded as a module, without OpenGL"""
+import importlib.util
+import os
+
+import pytest
+
+GAME_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '423_Project.py')
+
+
+@pytest.fixture
+def game():
+    """A fresh copy of the game module, so no test sees another test's globals"""
+    spec = importlib.util.spec_from_file_location('racing_game', GAME_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    yield module
+    module.run_close_hooks()
@@ -0,0 +1,50 @@
+"""Entity store storage and serialisation"""
+import pytest
+
+
+def filled_store(game):
+    store = game.EntityStore()
+    store.add(game.KIND_TREE, 120.5, -40.25, radius=30)
+    store.add(game.KIND_BOOST, 800, 0, z=5, radius=40, flags=game.FLAG_COLLECTED)
+    store.add(game.KIND_BIRD, -300, 650, z=200, angle=15, vx=1.5, vy=-0.5)
+    return store
+
+
+def test_round_trip_keeps_every_component(game):
+    store = filled_store(game)
+    copy = game.EntityStore()
+    copy.add(game.KIND_CLOUD, 1, 2)  # Replaced, not appended to
+    copy.load_bytes(store.to_bytes())
+    assert len(copy) == len(store)
+    for name, _ in game.EntityStore.COMPONENTS:
+        assert getattr(copy, name) == getattr(store, name), name
+
+
+def test_round_trip_of_an_empty_store(game):
+    copy = filled_store(game)
+    copy.load_bytes(game.EntityStore().to_bytes())
+    assert len(copy) == 0
+    assert copy.memory() == 0
+
+
+def test_loaded_arrays_are_independent(game):
+    store = filled_store(game)
+    copy = game.EntityStore()
+    copy.load_bytes(store.to_bytes())
+    copy.x[0] = 0
+    copy.add(game.KIND_TREE, 5, 5)
+    assert store.x[0] == 120.5
+    assert len(store) == 3
+
+
+def test_views_read_the_arrays(game):
+    store = filled_store(game)
+    boost = store[1]
+    assert boost.pos == (800, 0)
+    assert boost.kind == game.KIND_BOOST
+    assert boost.collected
+    boost.collected = False
+    assert store.flags[1] == 0
+    assert store[-1].kind == game.KIND_BIRD
+    with pytest.raises(IndexError):
+        store[3]
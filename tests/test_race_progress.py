@@ -0,0 +1,80 @@
+"""Race progress ranking, gaps and reset"""
+import math
+
+import pytest
+
+CHECKPOINT_ANGLES = (45, 135, 225, 315)  # Degrees around the circuit, in driving order
+
+
+def at(angle):
+    """Point on the centreline this many degrees round from the start line"""
+    radians = math.radians(angle)
+    return math.cos(radians) * 800, math.sin(radians) * 800
+
+
+@pytest.fixture
+def progress(game):
+    game.total_laps = 3
+    return game.RaceProgress(game.track_centreline(), [at(angle) for angle in CHECKPOINT_ANGLES])
+
+
+def test_cars_are_ranked_by_race_distance(progress):
+    progress.update([(0, *at(20), 0), (1, *at(30), 0), (2, *at(10), 0)], 1.0)
+    assert progress.order == [1, 0, 2]
+    assert [progress.cars[car].position for car in (1, 0, 2)] == [1, 2, 3]
+    assert progress.cars[1].gap == 0
+    assert progress.cars[0].gap == pytest.approx(progress.lap_length * 10 / 360, rel=1e-3)
+
+
+def test_a_lap_ahead_leads_whatever_the_position(progress):
+    lap = len(CHECKPOINT_ANGLES)
+    progress.update([(0, *at(10), lap), (1, *at(40), 0)], 20.0)
+    assert progress.order == [0, 1]
+    assert progress.cars[0].distance > progress.lap_length
+
+
+def test_gap_time_at_the_last_checkpoint(progress):
+    progress.update([(0, *at(40), 0), (1, *at(50), 1)], 1.0)
+    progress.update([(0, *at(50), 1), (1, *at(60), 1)], 1.5)
+    assert progress.order == [1, 0]
+    assert progress.cars[1].splits == [1.0]
+    assert progress.cars[0].splits == [1.5]
+    assert progress.cars[0].gap_time == pytest.approx(0.5)
+    assert progress.cars[1].gap_time == 0
+
+
+def test_finished_cars_rank_by_finishing_time(progress):
+    finish = 3 * len(CHECKPOINT_ANGLES)
+    progress.update([(0, *at(320), finish), (1, *at(300), finish - 1)], 60.0)
+    progress.update([(0, *at(330), finish), (1, *at(320), finish)], 61.0)
+    assert progress.order == [0, 1]
+    assert progress.cars[0].finish_time == 60.0
+    assert progress.cars[1].finish_time == 61.0
+    assert progress.fraction(0) == 1.0
+
+
+def test_reset_forgets_the_old_race(progress):
+    progress.update([(0, *at(50), 1), (1, *at(60), 1)], 2.0)
+    progress.reset()
+    assert progress.cars == {} and progress.order == []
+
+    progress.update([(0, *at(5), 0)], 0.1)
+    assert progress.order == [0]
+    assert progress.cars[0].splits == []
+    assert progress.fraction(0) < 0.01
+
+
+def test_checkpoints_passed_counts_whole_laps(game):
+    game.init_game()
+    per_lap = len(game.checkpoints)
+    assert game.checkpoints_passed(1, 0) == 0
+    assert game.checkpoints_passed(2, 1) == per_lap + 1
+
+
+def test_restart_key_resets_progress(game):
+    game.init_game()
+    game.game_state = game.GAME_STATE_RACING
+    game.update_progress()
+    assert game.race_progress.order == [0]
+    game.handle_key_down(b'r')
+    assert game.race_progress.cars == {}
@@ -0,0 +1,76 @@
+"""Snapshot capture and restore"""
+import random
+
+import pytest
+
+
+@pytest.fixture
+def race(game):
+    random.seed(3)
+    game.init_game()
+    game.clock = game.SimClock()
+    game.game_state = game.GAME_STATE_RACING
+    return game
+
+
+def drive(game, ticks):
+    for tick in range(ticks):
+        game.ai_driver(tick)
+        game.step_simulation()
+        game.update_birds()
+        game.update_clouds()
+
+
+def state(game):
+    """Everything a snapshot promises to bring back - bird wing angles follow the wall clock"""
+    return (list(game.car_pos), game.car_rotation, game.car_speed, game.game_state,
+            game.current_checkpoint, game.current_lap, list(game.lap_times), game.best_lap_time,
+            game.current_time, game.boost_active, game.is_off_track, game.current_surface,
+            dict(game.keys_pressed), list(game.boost_points.flags), list(game.birds.x),
+            list(game.birds.y), list(game.clouds.x), game.sun_angle, random.getstate())
+
+
+def test_restore_brings_back_the_captured_state(race):
+    drive(race, 300)
+    captured_at = race.clock.now
+    expected = state(race)
+    snapshot = race.capture_state()
+
+    drive(race, 200)
+    assert state(race) != expected
+    race.clock.now = captured_at
+    race.restore_state(snapshot)
+    assert state(race) == expected
+
+
+def test_restored_race_replays_identically(race):
+    drive(race, 300)
+    captured_at = race.clock.now
+    snapshot = race.capture_state()
+    drive(race, 400)
+    first_run = state(race)
+
+    race.clock.now = captured_at
+    race.restore_state(snapshot)
+    drive(race, 400)
+    assert state(race) == first_run
+
+
+def test_timers_are_relative_to_the_clock(race):
+    drive(race, 100)
+    lap_elapsed = race.clock() - race.lap_start_time
+    snapshot = race.capture_state()
+    race.clock.now += 50  # Restored later, e.g. after a pause
+    race.restore_state(snapshot)
+    assert race.clock() - race.lap_start_time == pytest.approx(lap_elapsed)
+
+
+def test_rejects_other_versions_and_layouts(race):
+    snapshot = bytearray(race.capture_state())
+    bad_version = bytes(snapshot[:4]) + bytes([0xFF, 0xFF]) + bytes(snapshot[6:])
+    with pytest.raises(ValueError):
+        race.restore_state(bad_version)
+
+    race.clouds.add(race.KIND_CLOUD, 0, 0, 400)
+    with pytest.raises(ValueError):
+        race.restore_state(bytes(snapshot))
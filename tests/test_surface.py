@@ -0,0 +1,67 @@
+"""Surface raster lookups"""
+import math
+import os
+
+import pytest
+
+
+@pytest.fixture
+def surfaces(game, tmp_path, monkeypatch):
+    monkeypatch.setattr(game, 'SURFACE_CACHE_DIR', str(tmp_path))
+    game.load_surface_map()
+    return game
+
+
+def exact_surface(game, x, y):
+    """Surface from the ring definitions themselves - later bands paint over earlier ones"""
+    r = math.hypot(x, y)
+    surface = game.SURFACE_GRASS
+    for inner, outer, band in game.TRACK_BANDS:
+        if inner <= r < outer:
+            surface = band
+    return surface
+
+
+def cell_centres(game, step=7):
+    cell = game.SURFACE_CELL
+    for j in range(0, game.surface_cells, step):
+        for i in range(0, game.surface_cells, step):
+            yield -game.SURFACE_EXTENT + (i + 0.5) * cell, -game.SURFACE_EXTENT + (j + 0.5) * cell
+
+
+def test_raster_matches_the_track_bands(surfaces):
+    for x, y in cell_centres(surfaces):
+        assert surfaces.surface_at(x, y) == exact_surface(surfaces, x, y), (x, y)
+
+
+def test_every_surface_is_on_the_circuit(surfaces):
+    across = [surfaces.surface_at(x, 0) for x in range(0, 1000, 2)]
+    assert set(across) == {surfaces.SURFACE_ASPHALT, surfaces.SURFACE_KERB,
+                           surfaces.SURFACE_GRASS, surfaces.SURFACE_GRAVEL}
+    assert surfaces.surface_at(800, 0) == surfaces.SURFACE_ASPHALT
+    assert surfaces.surface_at(0, -705) == surfaces.SURFACE_KERB
+    assert surfaces.surface_at(-930, 0) == surfaces.SURFACE_GRAVEL
+
+
+def test_outside_the_raster_is_grass(surfaces):
+    extent = surfaces.SURFACE_EXTENT
+    for x, y in ((extent, 0), (0, -extent - 1), (1e6, 1e6)):
+        assert surfaces.surface_at(x, y) == surfaces.SURFACE_GRASS
+
+
+def test_batch_lookup_matches_single_lookups(surfaces):
+    points = list(cell_centres(surfaces, step=31)) + [(5000, 0), (-2000, -2000)]
+    xs, ys = zip(*points)
+    assert list(surfaces.surfaces_at(xs, ys)) == [surfaces.surface_at(x, y) for x, y in points]
+
+
+def test_cached_raster_is_reused(surfaces, monkeypatch):
+    assert os.path.exists(surfaces.surface_cache_path())
+    built = bytes(surfaces.surface_map)
+    
+    def build_again():
+        raise AssertionError("raster rebuilt despite the cache")
+    monkeypatch.setattr(surfaces, 'build_surface_map', build_again)
+    surfaces.surface_map = None
+    surfaces.load_surface_map()
+    assert bytes(surfaces.surface_map) == built
@@ -0,0 +1,40 @@
+"""Sweep cache keys"""
+
+SCRIPT = [[0, 'w', True], [120, 'a', True], [150, 'a', False]]
+
+
+def key(game, params=None, driver='ai', script=None, **overrides):
+    settings = dict(runs=3, laps=3, max_time=300)
+    settings.update(overrides)
+    return game.sweep_key(params or {'car_acceleration': 2.0}, driver, script=script, **settings)
+
+
+def test_key_is_stable_and_ignores_param_order(game):
+    params = {'car_acceleration': 2.0, 'car_friction': 0.97}
+    assert key(game, params) == key(game, dict(reversed(list(params.items()))))
+
+
+def test_key_changes_with_every_setting(game):
+    base = key(game)
+    assert key(game, {'car_acceleration': 2.5}) != base
+    assert key(game, driver='lookahead') != base
+    assert key(game, runs=4) != base
+    assert key(game, laps=2) != base
+    assert key(game, max_time=200) != base
+
+
+def test_scripted_key_covers_the_script(game):
+    base = key(game, driver='scripted', script=SCRIPT)
+    assert key(game, driver='scripted', script=list(reversed(SCRIPT))) == base  # Replayed in time order
+    assert key(game, driver='scripted', script=SCRIPT[:2]) != base
+    assert key(game, driver='scripted') != base
+
+
+def test_script_is_ignored_by_other_drivers(game):
+    assert key(game, script=SCRIPT) == key(game)
+
+
+def test_key_changes_with_cache_version(game, monkeypatch):
+    base = key(game)
+    monkeypatch.setattr(game, 'SWEEP_CACHE_VERSION', game.SWEEP_CACHE_VERSION + 1)
+    assert key(game) != base
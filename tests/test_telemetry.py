@@ -0,0 +1,52 @@
+"""Telemetry recording and lazy column reads"""
+import pytest
+
+
+def record_races(game, directory, races=2):
+    session = game.start_telemetry(str(directory))
+    for seed in range(races):
+        game.run_headless_race(seed=seed, laps=1)
+    game.run_close_hooks()  # Closes the recorder, as the game does on exit
+    return game.TelemetrySession(session)
+
+
+def test_every_tick_is_read_back(game, tmp_path):
+    session = record_races(game, tmp_path)
+    assert session.records > 0
+    for name, _ in game.TELEMETRY_COLUMNS:
+        assert len(session.column(name)) == session.records
+    assert max(session.column('lap')) == 1
+
+
+def test_session_clock_never_goes_backwards(game, tmp_path):
+    times = record_races(game, tmp_path).column('time')
+    assert all(a < b for a, b in zip(times, times[1:]))
+
+
+def test_each_race_is_a_segment(game, tmp_path):
+    session = record_races(game, tmp_path)
+    segments = session.segments()
+    assert [race for race, _, _ in segments] == [0, 1]
+    assert segments[0][1] == 0 and segments[-1][2] == session.records
+    race_times = session.raw_column('race_time')
+    for _, first, end in segments:
+        times = race_times[first:end]
+        assert all(a <= b for a, b in zip(times, times[1:]))
+
+
+def test_time_range_reads(game, tmp_path):
+    session = record_races(game, tmp_path)
+    times = list(session.column('time'))
+    start, end = times[10], times[40]
+    lo, hi = session.index_range(start, end)
+    assert (lo, hi) == (10, 40)
+    assert list(session.column('time', start, end)) == times[10:40]
+    speeds = session.columns(['speed', 'x'], start, end)
+    assert list(speeds['speed']) == list(session.raw_column('speed')[10:40])
+    assert len(speeds['x']) == 30
+
+
+def test_unknown_column(game, tmp_path):
+    session = record_races(game, tmp_path, races=1)
+    with pytest.raises(KeyError):
+        session.column('altitude')